@@ -0,0 +1,75 @@
+"""
+Maintenance des agrégats dénormalisés de Exam (num_questions, num_points,
+answer_key_version).
+
+Les signaux appliquent des mises à jour incrémentales (F expressions) ;
+refresh_exam_aggregates() recalcule tout en une seule requête UPDATE.
+Chaque mise à jour touche aussi updated_at, qui versionne le cache du
+contenu (exams/content_cache.py).
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Exam, Question
+
+
+def _question_aggregate(aggregate):
+    """Sous-requête corrélée : agrégat sur les questions de l'examen"""
+    return Coalesce(
+        Subquery(
+            Question.objects.filter(exam=OuterRef('pk'))
+            .order_by()
+            .values('exam')
+            .annotate(value=aggregate)
+            .values('value'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def refresh_exam_aggregates(exams=None):
+    """
+    Recalcule les agrégats d'un ensemble d'examens (queryset, liste d'ids
+    ou None pour tous) en une seule requête. Retourne le nombre d'examens.
+    """
+    if exams is None:
+        exams = Exam.objects.all()
+    elif not hasattr(exams, 'update'):
+        exams = Exam.objects.filter(pk__in=list(exams))
+
+    return exams.update(
+        num_questions=_question_aggregate(Count('pk')),
+        num_points=_question_aggregate(Sum('points')),
+        answer_key_version=F('answer_key_version') + 1,
+        updated_at=timezone.now(),
+    )
+
+
+def question_added(exam_id, points):
+    """Une question vient d'être créée"""
+    Exam.objects.filter(pk=exam_id).update(
+        num_questions=F('num_questions') + 1,
+        num_points=F('num_points') + points,
+        answer_key_version=F('answer_key_version') + 1,
+        updated_at=timezone.now(),
+    )
+
+
+def question_removed(exam_id, points):
+    """Une question vient d'être supprimée"""
+    Exam.objects.filter(pk=exam_id).update(
+        num_questions=F('num_questions') - 1,
+        num_points=F('num_points') - points,
+        answer_key_version=F('answer_key_version') + 1,
+        updated_at=timezone.now(),
+    )
+
+
+def answer_key_changed(question_id):
+    """Un choix de réponse de la question a été ajouté, modifié ou supprimé"""
+    Exam.objects.filter(questions=question_id).update(
+        answer_key_version=F('answer_key_version') + 1,
+        updated_at=timezone.now(),
+    )
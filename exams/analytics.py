@@ -0,0 +1,97 @@
+"""
+Statistiques d'un examen sur l'ensemble de ses sessions terminées.
+
+Les scores et durées sont lus par blocs (iterator(chunk_size=...)) dans des
+tableaux NumPy, puis tous les indicateurs sont calculés de façon vectorisée.
+Le résultat est mis en cache jusqu'à la prochaine session terminée ou au
+prochain recalcul des scores de cet examen (version incrémentée par
+ExamSession.finish, exams/grading.py et scoring.rescore_sessions, voir
+exams/versions.py ; le cache doit être partagé entre les workers).
+"""
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import ExamSession
+from .versions import exam_results_version
+
+DEFAULT_CHUNK_SIZE = 10000
+PERCENTILES = (10, 25, 50, 75, 90, 95, 99)
+SCORE_BINS = np.linspace(0, 100, 11)
+
+
+def load_results(exam, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Retourne (scores, durées en minutes) des sessions terminées, en tableaux NumPy"""
+    rows = (
+        ExamSession.objects
+        .filter(exam=exam, status='completed', score__isnull=False)
+        .order_by()
+        .values_list('score', 'started_at', 'finished_at')
+        .iterator(chunk_size=chunk_size)
+    )
+    score_chunks = []
+    duration_chunks = []
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        score_chunks.append(np.fromiter((row[0] for row in chunk), dtype=np.float64, count=len(chunk)))
+        duration_chunks.append(np.fromiter(
+            ((row[2] - row[1]).total_seconds() / 60 if row[2] else np.nan for row in chunk),
+            dtype=np.float64,
+            count=len(chunk),
+        ))
+    if not score_chunks:
+        return np.empty(0), np.empty(0)
+    return np.concatenate(score_chunks), np.concatenate(duration_chunks)
+
+
+def _distribution(values, bins):
+    counts, edges = np.histogram(values, bins=bins)
+    return [
+        {'from': round(float(low), 2), 'to': round(float(high), 2), 'count': int(count)}
+        for low, high, count in zip(edges[:-1], edges[1:], counts)
+    ]
+
+
+def _summary(values):
+    if not values.size:
+        return None
+    return {
+        'mean': round(float(values.mean()), 2),
+        'std': round(float(values.std()), 2),
+        'min': round(float(values.min()), 2),
+        'max': round(float(values.max()), 2),
+        'percentiles': {
+            p: round(float(v), 2) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))
+        },
+    }
+
+
+def compute_analytics(exam, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Calcule les statistiques d'un examen (sans cache)"""
+    scores, durations = load_results(exam, chunk_size)
+    durations = durations[~np.isnan(durations)]
+
+    return {
+        'exam_id': exam.pk,
+        'sessions': int(scores.size),
+        'passing_score': exam.passing_score,
+        'pass_rate': round(float((scores >= exam.passing_score).mean() * 100), 2) if scores.size else None,
+        'score': _summary(scores),
+        'score_histogram': _distribution(scores, SCORE_BINS) if scores.size else [],
+        'duration': _summary(durations),
+        'duration_histogram': _distribution(durations, 10) if durations.size else [],
+    }
+
+
+def get_exam_analytics(exam, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Statistiques d'un examen, en cache jusqu'à la prochaine session terminée"""
+    key = f'exam_analytics:{exam.pk}:{exam.passing_score}:{exam_results_version(exam.pk)}'
+    analytics = cache.get(key)
+    if analytics is None:
+        analytics = compute_analytics(exam, chunk_size)
+        cache.set(key, analytics, getattr(settings, 'EXAM_ANALYTICS_CACHE_TIMEOUT', 24 * 60 * 60))
+    return analytics
@@ -0,0 +1,120 @@
+"""
+Versions asynchrones des vues en lecture seule (servies en ASGI, uvicorn).
+
+Même rendu que les vues de exams/views.py, avec l'ORM asynchrone : les
+requêtes indépendantes d'une vue sont lancées ensemble (asyncio.gather) et
+les querysets sont évalués avant le rendu (un template ne doit déclencher
+aucune requête bloquante dans la boucle d'événements).
+
+Activées par USE_ASYNC_VIEWS (positionné par projet9/asgi.py).
+"""
+import asyncio
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import aget_object_or_404, render
+
+from projet9.middleware import resolve_user
+
+from .counters import ACTIVE_EXAMS, DISTINCT_STUDENTS, aget_counters
+from .models import Exam, ExamSession, UserExamStats
+from .versions import aexam_catalog_version, auser_sessions_version
+
+
+def login_required(view):
+    """
+    login_required pour vue asynchrone : celui de Django passe son test
+    (synchrone) par sync_to_async, ici l'utilisateur est résolu sans thread.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await resolve_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def _list(queryset):
+    return [obj async for obj in queryset]
+
+
+async def home(request):
+    """Page d'accueil"""
+    await resolve_user(request)
+    counters = await aget_counters()
+    context = {
+        'total_exams': counters[ACTIVE_EXAMS],
+        'total_students': counters[DISTINCT_STUDENTS],
+    }
+    return render(request, 'exams/home.html', context)
+
+
+@login_required
+async def exam_list(request):
+    """Liste de tous les examens disponibles"""
+    exams, completed_exam_ids, catalog_version, sessions_version = await asyncio.gather(
+        _list(Exam.objects.filter(is_active=True)),
+        _list(
+            ExamSession.objects.filter(user=request.user, status='completed')
+            .order_by().values_list('exam_id', flat=True)
+        ),
+        aexam_catalog_version(),
+        auser_sessions_version(request.user.pk),
+    )
+    context = {
+        'exams': exams,
+        'completed_exam_ids': completed_exam_ids,
+        'catalog_version': catalog_version,
+        'sessions_version': sessions_version,
+        'fragment_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
+    }
+    return render(request, 'exams/exam_list.html', context)
+
+
+@login_required
+async def exam_detail(request, exam_id):
+    """Détails d'un examen"""
+    exam, existing_session, sessions_version = await asyncio.gather(
+        aget_object_or_404(Exam, id=exam_id, is_active=True),
+        ExamSession.objects.filter(user=request.user, exam_id=exam_id).afirst(),
+        auser_sessions_version(request.user.pk),
+    )
+    context = {
+        'exam': exam,
+        'existing_session': existing_session,
+        'sessions_version': sessions_version,
+        'fragment_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
+    }
+    return render(request, 'exams/exam_detail.html', context)
+
+
+@login_required
+async def my_results(request):
+    """Afficher tous les résultats de l'utilisateur"""
+    sessions = await _list(
+        ExamSession.objects.filter(user=request.user, status='completed')
+        .select_related('exam').order_by('-finished_at')
+    )
+    return render(request, 'exams/my_results.html', {'sessions': sessions})
+
+
+@login_required
+async def dashboard(request):
+    """Tableau de bord de l'utilisateur"""
+    stats, recent_sessions = await asyncio.gather(
+        UserExamStats.objects.filter(user=request.user).afirst(),
+        _list(
+            ExamSession.objects.filter(user=request.user)
+            .select_related('exam').order_by('-started_at')[:5]
+        ),
+    )
+    stats = stats or UserExamStats(user=request.user)
+    context = {
+        'total_exams_taken': stats.exams_taken,
+        'total_exams_passed': stats.exams_passed,
+        'avg_score': round(stats.average_score, 2),
+        'recent_sessions': recent_sessions,
+    }
+    return render(request, 'exams/dashboard.html', context)
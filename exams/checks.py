@@ -0,0 +1,47 @@
+"""
+Vérifications système propres à l'application (python manage.py check [--deploy]).
+"""
+from django.conf import settings
+from django.core import checks
+
+# Caches propres à chaque processus : un incrément de version fait par un
+# worker n'est pas vu par les autres
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Le cache par défaut doit être partagé entre les workers en production"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        checks.Error(
+            'Le cache par défaut est propre à chaque processus : les versions des '
+            'fragments de templates et des statistiques (exams/versions.py) ne sont '
+            'pas partagées entre les workers.',
+            hint='Configurer un cache partagé (Redis, REDIS_URL) dans CACHES.',
+            obj=backend,
+            id='exams.E001',
+        )
+    ]
+
+
+@checks.register(checks.Tags.caches)
+def check_session_store_cache(app_configs, **kwargs):
+    """Le moteur exams.session_store exige un cache partagé hors DEBUG"""
+    engine = getattr(settings, 'MANUAL_SESSION_ENGINE', None)
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if settings.DEBUG or engine != 'exams.session_store' or backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        checks.Error(
+            'exams.session_store avec un cache propre à chaque processus : une session '
+            'modifiée ou supprimée (déconnexion) par un worker reste servie par les autres.',
+            hint='Configurer un cache partagé (Redis, REDIS_URL) dans CACHES.',
+            obj=engine,
+            id='exams.E002',
+        )
+    ]
@@ -0,0 +1,97 @@
+"""
+Cache du contenu des examens (questions, choix, points, corrigé).
+
+Deux niveaux : un LRU en mémoire du processus devant le cache Django.
+La clé contient l'id de l'examen et une version dérivée de Exam.updated_at ;
+les signaux de exams/signals.py mettent updated_at à jour à chaque
+modification d'une question ou d'un choix, ce qui invalide l'entrée.
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .lru import LRUCache
+from .models import Question
+
+
+_local = LRUCache(maxsize=getattr(settings, 'EXAM_CONTENT_LRU_SIZE', 256))
+
+# Un verrou par clé : un seul chargement en base par processus lors d'un
+# démarrage d'examen simultané
+_load_locks = {}
+_load_locks_guard = threading.Lock()
+
+
+def content_version(exam):
+    """Version du contenu d'un examen (microsecondes de updated_at)"""
+    return int(exam.updated_at.timestamp() * 1_000_000)
+
+
+def cache_key(exam_id, version):
+    return f'exam_content:{exam_id}:{version}'
+
+
+def get_exam_content(exam):
+    """Retourne le contenu sérialisé de l'examen, depuis le cache si possible"""
+    key = cache_key(exam.pk, content_version(exam))
+
+    content = _local.get(key)
+    if content is not None:
+        return content
+
+    with _load_locks_guard:
+        lock = _load_locks.setdefault(key, threading.Lock())
+    with lock:
+        content = _local.get(key)
+        if content is None:
+            content = cache.get(key)
+            if content is None:
+                content = build_exam_content(exam)
+                cache.set(key, content, getattr(settings, 'EXAM_CONTENT_CACHE_TIMEOUT', 3600))
+            _local.set(key, content)
+    with _load_locks_guard:
+        _load_locks.pop(key, None)
+    return content
+
+
+def build_exam_content(exam):
+    """Charge questions et choix en base et construit le contenu compact"""
+    questions = []
+    points = {}
+    correct_choices = set()
+    answer_key = {}
+    choice_question = {}
+
+    for question in Question.objects.filter(exam=exam).prefetch_related('choices'):
+        choices = []
+        for choice in question.choices.all():
+            choices.append({'id': choice.id, 'text': choice.text})
+            choice_question[choice.id] = question.id
+            if choice.is_correct:
+                correct_choices.add(choice.id)
+                answer_key.setdefault(question.id, choice.id)
+        questions.append({
+            'id': question.id,
+            'text': question.text,
+            'points': question.points,
+            'order': question.order,
+            'choices': choices,
+        })
+        points[question.id] = question.points
+
+    return {
+        'exam_id': exam.pk,
+        'version': content_version(exam),
+        'questions': questions,
+        'points': points,
+        'total_points': sum(points.values()),
+        'answer_key': answer_key,
+        'correct_choices': frozenset(correct_choices),
+        'choice_question': choice_question,
+    }
+
+
+def clear_local_cache():
+    """Vide le niveau en mémoire du processus"""
+    _local.clear()
@@ -0,0 +1,76 @@
+"""
+Compteurs globaux de la page d'accueil (examens actifs, étudiants distincts,
+sessions terminées).
+
+Les valeurs sont stockées dans GlobalCounter, mises à jour par incréments
+(F expressions) au fil des événements, et lues via le cache Django avec un
+TTL court : la page d'accueil ne fait aucune requête d'agrégation.
+reconcile() les recalcule entièrement.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Exam, ExamSession, GlobalCounter
+
+ACTIVE_EXAMS = 'active_exams'
+DISTINCT_STUDENTS = 'distinct_students'
+COMPLETED_SESSIONS = 'completed_sessions'
+COUNTERS = (ACTIVE_EXAMS, DISTINCT_STUDENTS, COMPLETED_SESSIONS)
+
+CACHE_KEY = 'exams:global_counters'
+
+
+def get_counters():
+    """Retourne {nom: valeur} depuis le cache (une simple lecture de table sinon)"""
+    values = cache.get(CACHE_KEY)
+    if values is None:
+        values = dict.fromkeys(COUNTERS, 0)
+        values.update(GlobalCounter.objects.values_list('name', 'value'))
+        cache.set(CACHE_KEY, values, getattr(settings, 'GLOBAL_COUNTERS_CACHE_TTL', 30))
+    return values
+
+
+async def aget_counters():
+    """Version asynchrone de get_counters (vues ASGI)"""
+    values = await cache.aget(CACHE_KEY)
+    if values is None:
+        values = dict.fromkeys(COUNTERS, 0)
+        values.update([row async for row in GlobalCounter.objects.values_list('name', 'value')])
+        await cache.aset(CACHE_KEY, values, getattr(settings, 'GLOBAL_COUNTERS_CACHE_TTL', 30))
+    return values
+
+
+def increment(name, delta=1):
+    """Ajoute `delta` au compteur (une requête UPDATE)"""
+    if GlobalCounter.objects.filter(name=name).update(value=F('value') + delta):
+        return
+    try:
+        with transaction.atomic():
+            GlobalCounter.objects.create(name=name, value=delta)
+    except IntegrityError:
+        GlobalCounter.objects.filter(name=name).update(value=F('value') + delta)
+
+
+def set_value(name, value):
+    GlobalCounter.objects.update_or_create(name=name, defaults={'value': value})
+
+
+def refresh_active_exams():
+    """Recalcule le nombre d'examens actifs (table des examens : petite)"""
+    set_value(ACTIVE_EXAMS, Exam.objects.filter(is_active=True).count())
+
+
+def reconcile():
+    """Recalcule tous les compteurs depuis les tables sources"""
+    values = {
+        ACTIVE_EXAMS: Exam.objects.filter(is_active=True).count(),
+        DISTINCT_STUDENTS: ExamSession.objects.values('user').distinct().count(),
+        COMPLETED_SESSIONS: ExamSession.objects.filter(status='completed').count(),
+    }
+    with transaction.atomic():
+        for name, value in values.items():
+            set_value(name, value)
+    cache.delete(CACHE_KEY)
+    return values
@@ -0,0 +1,309 @@
+"""
+Génération d'un jeu de données synthétique pour les tests de charge et les
+benchmarks : utilisateurs, examens, sessions, réponses et journal des
+requêtes.
+
+Le générateur est reproductible (même graine et mêmes paramètres = mêmes
+données, aux dates relatives près). Les réponses suivent un modèle de Rasch :
+chaque étudiant a un niveau, chaque question une difficulté, et la
+probabilité de bonne réponse est logistique en (niveau - difficulté), ce qui
+donne une distribution de scores réaliste.
+
+Les examens passent par exams/importer.py ; les grosses tables (sessions,
+réponses, journal) sont insérées par executemany sans instancier de modèles,
+avec des clés primaires attribuées explicitement (MySQL ne renvoie pas les
+clés d'un INSERT multi-lignes) ; la séquence est ensuite recalée
+(PostgreSQL : sinon le prochain INSERT de l'ORM reprendrait une clé prise).
+"""
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .importer import import_exams
+from .models import Answer, Choice, Exam, ExamSession, Question, RequestLog
+
+DEFAULT_PASSWORD = 'motdepasse123'
+DEFAULT_BATCH_SIZE = 5000
+STATUSES = np.array(['completed', 'in_progress', 'abandoned'])
+STATUS_WEIGHTS = (0.85, 0.10, 0.05)
+ANSWERS_PER_CHUNK = 200000
+
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_6) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/18.0 Safari/605.1.15',
+    'Mozilla/5.0 (X11; Linux x86_64; rv:131.0) Gecko/20100101 Firefox/131.0',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 18_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148',
+]
+# (chemin, méthode, poids) ; {exam} / {session} remplacés par des identifiants
+LOG_ROUTES = [
+    ('/', 'GET', 10),
+    ('/exams/', 'GET', 25),
+    ('/exam/{exam}/', 'GET', 15),
+    ('/exam/{exam}/start/', 'GET', 5),
+    ('/exam/{exam}/take/', 'GET', 10),
+    ('/exam/{exam}/take/', 'POST', 5),
+    ('/result/{session}/', 'GET', 8),
+    ('/dashboard/', 'GET', 10),
+    ('/my-results/', 'GET', 6),
+    ('/login/', 'GET', 3),
+    ('/login/', 'POST', 3),
+]
+
+
+def insert_rows(model, fields, rows, batch_size=DEFAULT_BATCH_SIZE):
+    """INSERT multi-lignes (executemany) sans instancier de modèles"""
+    fields = [model._meta.get_field(name) for name in fields]
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table),
+        ', '.join(quote(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+    )
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[start:start + batch_size])
+
+
+def _next_pk(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def reset_sequences(*models):
+    """Recale les séquences après des clés primaires explicites (PostgreSQL, Oracle)"""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def _db_datetimes(base, seconds):
+    """Convertit des décalages (secondes, tableau NumPy) en valeurs SQL"""
+    adapt = connection.ops.adapt_datetimefield_value
+    return [adapt(base + timedelta(seconds=offset)) for offset in seconds.tolist()]
+
+
+class DatasetGenerator:
+    """Construit le jeu de données étape par étape (voir generate())"""
+
+    def __init__(self, users=1000, exams=20, questions=20, choices=4, sessions=10000,
+                 logs=50000, seed=42, prefix='gen', days=90,
+                 batch_size=DEFAULT_BATCH_SIZE, progress=None):
+        if sessions > users * exams:
+            raise ValueError(
+                f'{sessions} sessions demandées, au plus {users * exams} '
+                f'(une session par utilisateur et par examen)'
+            )
+        if choices < 2:
+            raise ValueError('Au moins deux choix par question')
+        self.n_users, self.n_exams, self.n_questions = users, exams, questions
+        self.n_choices, self.n_sessions, self.n_logs = choices, sessions, logs
+        self.prefix, self.days, self.batch_size = prefix, days, batch_size
+        self.rng = np.random.default_rng(seed)
+        self.now = timezone.now().replace(microsecond=0)
+        self.progress = progress or (lambda message: None)
+        self.counts = {}
+
+    def generate(self):
+        """Génère tout le jeu de données ; retourne le nombre de lignes par table"""
+        if User.objects.filter(username__startswith=f'{self.prefix}_user_').exists():
+            raise ValueError(f'Un jeu de données « {self.prefix} » existe déjà')
+        steps = [
+            ('utilisateurs', self.create_users),
+            ('examens', self.create_exams),
+            ('sessions et réponses', self.create_sessions),
+            ('journal des requêtes', self.create_logs),
+            ('statistiques et compteurs', self.refresh_derived_data),
+        ]
+        for label, step in steps:
+            start = time.perf_counter()
+            with transaction.atomic():
+                step()
+            self.progress(f'{label} : {time.perf_counter() - start:.2f}s')
+        return self.counts
+
+    def create_users(self):
+        password = make_password(DEFAULT_PASSWORD)
+        usernames = [f'{self.prefix}_user_{index}' for index in range(self.n_users)]
+        User.objects.bulk_create(
+            [User(username=name, email=f'{name}@example.com', password=password) for name in usernames],
+            batch_size=self.batch_size,
+        )
+        ids = dict(User.objects.filter(username__startswith=f'{self.prefix}_user_')
+                   .values_list('username', 'pk'))
+        self.user_ids = np.array([ids[name] for name in usernames], dtype=np.int64)
+        self.ability = self.rng.normal(0, 1, self.n_users)
+        self.counts['users'] = self.n_users
+
+    def create_exams(self):
+        shape = (self.n_exams, self.n_questions)
+        self.points = self.rng.integers(1, 4, shape)
+        self.difficulty = self.rng.normal(0, 1, shape)
+        self.correct_index = self.rng.integers(0, self.n_choices, shape)
+        self.durations = self.rng.choice([15, 20, 30, 45, 60], self.n_exams)
+
+        exams = []
+        for e in range(self.n_exams):
+            exams.append({
+                'external_id': f'{self.prefix}-exam-{e}',
+                'title': f'Examen {e + 1}',
+                'description': f'Examen généré ({self.n_questions} questions)',
+                'duration': int(self.durations[e]),
+                'passing_score': 60,
+                'questions': [
+                    {
+                        'text': f'Question {q + 1} de l\'examen {e + 1}',
+                        'points': int(self.points[e, q]),
+                        'order': q + 1,
+                        'choices': [
+                            {'text': f'Réponse {c + 1}', 'is_correct': bool(c == self.correct_index[e, q])}
+                            for c in range(self.n_choices)
+                        ],
+                    }
+                    for q in range(self.n_questions)
+                ],
+            })
+        import_exams(exams, batch_size=self.batch_size)
+
+        # Identifiants relus via les external_id dérivés par l'import
+        exam_prefix = f'{self.prefix}-exam-'
+        exam_ids = dict(Exam.objects.filter(external_id__startswith=exam_prefix).values_list('external_id', 'pk'))
+        question_ids = dict(Question.objects.filter(external_id__startswith=exam_prefix)
+                            .values_list('external_id', 'pk'))
+        choice_ids = dict(Choice.objects.filter(external_id__startswith=exam_prefix)
+                          .values_list('external_id', 'pk'))
+        self.exam_ids = np.array([exam_ids[f'{exam_prefix}{e}'] for e in range(self.n_exams)], dtype=np.int64)
+        self.question_ids = np.array([
+            [question_ids[f'{exam_prefix}{e}/{q + 1}'] for q in range(self.n_questions)]
+            for e in range(self.n_exams)
+        ], dtype=np.int64).reshape(shape)
+        self.choice_ids = np.array([
+            [[choice_ids[f'{exam_prefix}{e}/{q + 1}/{c + 1}'] for c in range(self.n_choices)]
+             for q in range(self.n_questions)]
+            for e in range(self.n_exams)
+        ], dtype=np.int64).reshape(shape + (self.n_choices,))
+        self.counts.update(exams=self.n_exams, questions=self.n_exams * self.n_questions,
+                           choices=self.n_exams * self.n_questions * self.n_choices)
+
+    def create_sessions(self):
+        pairs = self.rng.choice(self.n_users * self.n_exams, self.n_sessions, replace=False)
+        user_index, exam_index = pairs // self.n_exams, pairs % self.n_exams
+        status = STATUSES[self.rng.choice(len(STATUSES), self.n_sessions, p=STATUS_WEIGHTS)]
+        completed = status == 'completed'
+        started = self.rng.uniform(-self.days * 86400, -3600, self.n_sessions)
+        elapsed = self.durations[exam_index] * 60 * self.rng.beta(4, 2, self.n_sessions)
+        answered = np.where(completed, self.n_questions,
+                            self.rng.integers(0, self.n_questions + 1, self.n_sessions))
+
+        first_session = _next_pk(ExamSession)
+        self.session_ids = np.arange(first_session, first_session + self.n_sessions)
+        self.counts['sessions'] = self.n_sessions
+        self.counts['answers'] = 0
+
+        chunk = max(1, ANSWERS_PER_CHUNK // max(self.n_questions, 1))
+        for start in range(0, self.n_sessions, chunk):
+            part = slice(start, start + chunk)
+            scores, answers = self._simulate_answers(
+                self.session_ids[part], user_index[part], exam_index[part], answered[part],
+                started[part] + np.where(completed[part], elapsed[part], 0),
+            )
+            starts = _db_datetimes(self.now, started[part])
+            ends = _db_datetimes(self.now, started[part] + elapsed[part])
+            rows = [
+                (pk, int(self.user_ids[u]), int(self.exam_ids[e]), start_at,
+                 end_at if state == 'completed' else None,
+                 score if state == 'completed' else None,
+                 state, f'10.0.{pk // 250 % 250}.{pk % 250 + 1}')
+                for pk, u, e, start_at, end_at, score, state in zip(
+                    self.session_ids[part].tolist(), user_index[part], exam_index[part],
+                    starts, ends, scores.tolist(), status[part].tolist(),
+                )
+            ]
+            insert_rows(ExamSession, ['id', 'user', 'exam', 'started_at', 'finished_at',
+                                      'score', 'status', 'ip_address'], rows, self.batch_size)
+            insert_rows(Answer, ['session', 'question', 'choice', 'answered_at'], answers, self.batch_size)
+            self.counts['answers'] += len(answers)
+        reset_sequences(ExamSession)
+
+    def _simulate_answers(self, session_ids, user_index, exam_index, answered, answered_at):
+        """Simule les réponses d'un bloc de sessions ; retourne (scores en %, lignes Answer)"""
+        shape = (len(session_ids), self.n_questions)
+        exam_points = self.points[exam_index]
+        correct_index = self.correct_index[exam_index]
+
+        # Modèle de Rasch : P(bonne réponse) = logistique(niveau - difficulté)
+        logit = 1.7 * (self.ability[user_index][:, None] - self.difficulty[exam_index])
+        correct = self.rng.random(shape) < 1 / (1 + np.exp(-logit))
+        wrong_index = (correct_index + self.rng.integers(1, self.n_choices, shape)) % self.n_choices
+        chosen = np.where(correct, correct_index, wrong_index)
+        mask = np.arange(self.n_questions)[None, :] < answered[:, None]
+
+        earned = (correct * mask * exam_points).sum(axis=1)
+        scores = np.round(earned / exam_points.sum(axis=1) * 100, 2)
+
+        # Toutes les réponses d'une session sont enregistrées en même temps
+        rows, columns = np.nonzero(mask)
+        times = np.array(_db_datetimes(self.now, answered_at), dtype=object)
+        answers = list(zip(
+            session_ids[rows].tolist(),
+            self.question_ids[exam_index[rows], columns].tolist(),
+            self.choice_ids[exam_index[rows], columns, chosen[rows, columns]].tolist(),
+            times[rows].tolist(),
+        ))
+        return scores, answers
+
+    def create_logs(self):
+        if not self.n_logs:
+            self.counts['request_logs'] = 0
+            return
+        weights = np.array([weight for _, _, weight in LOG_ROUTES], dtype=np.float64)
+        routes = self.rng.choice(len(LOG_ROUTES), self.n_logs, p=weights / weights.sum())
+        anonymous = self.rng.random(self.n_logs) < 0.2
+        users = self.rng.integers(0, self.n_users, self.n_logs)
+        exams = self.rng.integers(0, self.n_exams, self.n_logs)
+        sessions = self.rng.integers(0, max(self.n_sessions, 1), self.n_logs)
+        status = self.rng.choice([200, 302, 404, 500], self.n_logs, p=(0.9, 0.07, 0.025, 0.005))
+        agents = self.rng.integers(0, len(USER_AGENTS), self.n_logs)
+        timestamps = _db_datetimes(self.now, np.sort(self.rng.uniform(-self.days * 86400, 0, self.n_logs)))
+        response_times = np.round(self.rng.lognormal(-3, 0.8, self.n_logs), 4)
+
+        session_ids = self.session_ids if self.n_sessions else np.zeros(1, dtype=np.int64)
+        rows = []
+        for i, route in enumerate(routes.tolist()):
+            path, method, _ = LOG_ROUTES[route]
+            rows.append((
+                None if anonymous[i] else int(self.user_ids[users[i]]),
+                method,
+                path.format(exam=self.exam_ids[exams[i]], session=session_ids[sessions[i]]),
+                int(status[i]),
+                f'192.168.{users[i] % 250}.{users[i] // 250 % 250 + 1}',
+                USER_AGENTS[agents[i]],
+                timestamps[i],
+                float(response_times[i]),
+            ))
+        insert_rows(RequestLog, ['user', 'method', 'path', 'status_code', 'ip_address',
+                                 'user_agent', 'timestamp', 'response_time'], rows, self.batch_size)
+        self.counts['request_logs'] = self.n_logs
+
+    def refresh_derived_data(self):
+        """Les insertions directes ne passent pas par les signaux ni par finish()"""
+        from .counters import reconcile
+        from .stats import rebuild_user_stats
+        from .versions import bump_exam_results_version
+
+        rebuild_user_stats(self.user_ids.tolist(), batch_size=self.batch_size)
+        reconcile()
+        for exam_id in self.exam_ids.tolist():
+            bump_exam_results_version(exam_id)
+
+
+def generate_dataset(**options):
+    """Raccourci : DatasetGenerator(**options).generate()"""
+    return DatasetGenerator(**options).generate()
@@ -0,0 +1,140 @@
+"""
+Export des résultats (sessions terminées et leurs réponses) en CSV ou JSONL.
+
+Les sessions sont lues par pages (pagination par clé : pk > dernière pk
+lue), chaque page étant écrite avant de lire la suivante : la mémoire
+utilisée reste bornée par la taille d'une page quelle que soit la taille de
+l'export. iterator() ne suffit pas : MySQLdb charge tout le résultat en
+mémoire côté client. Utilisé par la vue export_results (staff) et par la
+commande export_results.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+from itertools import groupby
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import ExamSession
+
+FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+DEFAULT_CHUNK_SIZE = 100  # Sessions par page (une ligne par réponse)
+LINES_PER_WRITE = 500
+
+SESSION_FIELDS = ('session_id', 'exam_id', 'exam', 'user_id', 'username',
+                  'started_at', 'finished_at', 'score')
+ANSWER_FIELDS = ('question_id', 'question', 'points', 'choice_id', 'choice', 'is_correct')
+COLUMNS = SESSION_FIELDS + ANSWER_FIELDS
+
+
+def parse_bound(value, end=False):
+    """
+    Convertit une borne 'AAAA-MM-JJ' ou ISO 8601 en datetime aware.
+    Une date seule comme borne de fin inclut toute la journée.
+    Lève ValueError si la valeur est invalide.
+    """
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Date invalide : {value}')
+        moment = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def export_rows(exam_id=None, since=None, until=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Itère sur une ligne par réponse (ou une ligne sans réponse pour une
+    session vide), triées par session puis par question. Deux requêtes par
+    page de `chunk_size` sessions.
+    """
+    sessions = ExamSession.objects.filter(status='completed')
+    if exam_id:
+        sessions = sessions.filter(exam_id=exam_id)
+    if since:
+        sessions = sessions.filter(finished_at__gte=since)
+    if until:
+        sessions = sessions.filter(finished_at__lt=until)
+
+    last = 0
+    while True:
+        # Bornes de la page : les chunk_size sessions suivantes
+        page = list(sessions.filter(pk__gt=last).order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not page:
+            return
+        yield from (
+            sessions.filter(pk__gt=last, pk__lte=page[-1])
+            .order_by('pk', 'answers__question__order', 'answers__question_id')
+            .values_list(
+                'pk', 'exam_id', 'exam__title', 'user_id', 'user__username',
+                'started_at', 'finished_at', 'score',
+                'answers__question_id', 'answers__question__text', 'answers__question__points',
+                'answers__choice_id', 'answers__choice__text', 'answers__choice__is_correct',
+            )
+        )
+        last = page[-1]
+
+
+class Echo:
+    """Pseudo-fichier : write() retourne la ligne au lieu de l'écrire"""
+
+    def write(self, value):
+        return value
+
+
+def _buffered(lines):
+    """Regroupe les lignes pour limiter le nombre d'écritures sur la socket"""
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= LINES_PER_WRITE:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def iter_csv(rows):
+    """Une ligne CSV par réponse, précédée de l'en-tête"""
+    writer = csv.writer(Echo())
+    lines = (writer.writerow(_format(row)) for row in rows)
+    return _buffered(_prepend(writer.writerow(COLUMNS), lines))
+
+
+def iter_jsonl(rows):
+    """Un objet JSON par session, avec la liste de ses réponses"""
+    def lines():
+        for _, session_rows in groupby(rows, key=lambda row: row[0]):
+            first = next(session_rows)
+            record = dict(zip(SESSION_FIELDS, _format(first[:len(SESSION_FIELDS)])))
+            record['answers'] = [
+                dict(zip(ANSWER_FIELDS, row[len(SESSION_FIELDS):]))
+                for row in _prepend(first, session_rows)
+                if row[len(SESSION_FIELDS)] is not None
+            ]
+            yield json.dumps(record, ensure_ascii=False) + '\n'
+    return _buffered(lines())
+
+
+def iter_export(export_format, **filters):
+    """Retourne le générateur de texte correspondant au format demandé"""
+    rows = export_rows(**filters)
+    return iter_csv(rows) if export_format == 'csv' else iter_jsonl(rows)
+
+
+def _prepend(first, iterator):
+    yield first
+    yield from iterator
+
+
+def _format(row):
+    return [value.isoformat() if hasattr(value, 'isoformat') else value for value in row]
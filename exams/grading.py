@@ -0,0 +1,117 @@
+"""
+Correction différée des sessions d'examen (GRADING_MODE = 'deferred').
+
+La soumission enregistre les réponses, passe la session au statut
+« grading » et met son identifiant en file : le coût de la requête ne
+dépend plus de la taille de l'examen. Un thread d'arrière-plan par
+processus (projet9.batching.BatchWriter) note les sessions par lots :
+une requête d'agrégation pour tout le lot (scoring.score_points), puis
+statistiques, compteurs et version des résultats.
+
+Le statut « grading » en base sert de file durable : une session perdue
+(file pleine, redémarrage) est remise en file quand son résultat est
+consulté, ou reprise par la commande grade_pending. Chaque session est
+réclamée par un UPDATE conditionnel, ce qui permet à plusieurs workers
+(threads, processus, grade_pending) de tourner en même temps.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from projet9 import metrics
+from projet9.batching import BatchWriter
+
+from . import counters
+from .models import ExamSession
+from .scoring import score_points, to_percentage
+from .stats import record_finished_session
+from .versions import bump_exam_results_version, bump_user_sessions_version
+
+INLINE = 'inline'
+DEFERRED = 'deferred'
+DEFAULT_BATCH_SIZE = 200
+
+
+def is_deferred():
+    return getattr(settings, 'GRADING_MODE', INLINE) == DEFERRED
+
+
+def grade_sessions(session_ids):
+    """
+    Note un lot de sessions au statut « grading » et les passe à
+    « completed ». Retourne le nombre de sessions notées par cet appel.
+    """
+    sessions = list(
+        ExamSession.objects.filter(pk__in=list(session_ids), status='grading').select_related('exam')
+    )
+    if not sessions:
+        return 0
+
+    points = score_points([session.pk for session in sessions])
+    graded = []
+    with transaction.atomic():
+        for session in sessions:
+            earned, total = points.get(session.pk, (0, 0))
+            session.score = to_percentage(earned, total)
+            session.status = 'completed'
+            # Réclamer la session : un autre worker a pu la noter entre-temps
+            if ExamSession.objects.filter(pk=session.pk, status='grading').update(
+                score=session.score, status='completed'
+            ):
+                record_finished_session(session)
+                graded.append(session)
+        if graded:
+            counters.increment(counters.COMPLETED_SESSIONS, len(graded))
+            exam_ids = {session.exam_id for session in graded}
+            user_ids = {session.user_id for session in graded}
+            transaction.on_commit(lambda: [bump_exam_results_version(exam_id) for exam_id in exam_ids])
+            # UPDATE sans signal : fragments des utilisateurs concernés
+            transaction.on_commit(lambda: [bump_user_sessions_version(user_id) for user_id in user_ids])
+    return len(graded)
+
+
+def grade_pending(older_than=0, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Note toutes les sessions restées au statut « grading » depuis plus de
+    `older_than` secondes. Retourne le nombre de sessions notées.
+    """
+    sessions = ExamSession.objects.filter(status='grading')
+    if older_than:
+        sessions = sessions.filter(finished_at__lte=timezone.now() - timedelta(seconds=older_than))
+
+    session_ids = list(sessions.order_by('finished_at').values_list('pk', flat=True))
+    graded = 0
+    for start in range(0, len(session_ids), batch_size):
+        graded += grade_sessions(session_ids[start:start + batch_size])
+    return graded
+
+
+grading_queue = BatchWriter(
+    'grading',
+    grade_sessions,
+    queue_size=getattr(settings, 'GRADING_QUEUE_SIZE', 10000),
+    batch_size=getattr(settings, 'GRADING_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+    flush_interval=getattr(settings, 'GRADING_FLUSH_INTERVAL', 0.5),
+)
+
+metrics.registry.gauge(
+    'projet9_grading_pending', 'Sessions en attente de correction dans la file',
+    callback=lambda: grading_queue.pending(),
+)
+
+
+def enqueue(session_id):
+    """Met la session en file de correction après le commit de la transaction"""
+    transaction.on_commit(lambda: grading_queue.submit(session_id))
+
+
+def ensure_queued(session):
+    """
+    Remet en file une session « grading » qui attend depuis plus de
+    GRADING_RETRY_AFTER secondes (file pleine, processus redémarré).
+    """
+    retry_after = getattr(settings, 'GRADING_RETRY_AFTER', 30)
+    if session.finished_at and timezone.now() - session.finished_at > timedelta(seconds=retry_after):
+        enqueue(session.pk)
@@ -0,0 +1,292 @@
+"""
+Import en masse d'une banque d'examens (examen → questions → choix).
+
+Formats acceptés :
+- JSON : liste d'examens (ou {"exams": [...]}) avec leurs questions et choix
+  imbriqués ;
+- CSV : une ligne par choix, colonnes exam_id, exam_title, exam_description,
+  exam_duration, exam_passing_score, question_id, question_text,
+  question_points, question_order, choice_text, is_correct (choice_id et
+  exam_is_active optionnelles).
+
+Chaque objet est identifié par son external_id : un import répété met à
+jour les lignes existantes au lieu de les dupliquer. Les identifiants des
+questions et des choix peuvent être omis, ils sont alors dérivés de leur
+position (« <examen>/<n> », « <question>/<n> »). Les questions ou choix
+absents du fichier ne sont pas supprimés (des réponses peuvent y faire
+référence) ; ceux d'une question importée perdent toutefois leur statut de
+bonne réponse, le fichier faisant foi pour le corrigé.
+"""
+import csv
+import json
+
+from django.db import connection, transaction
+
+from .models import Choice, Exam, Question
+
+DEFAULT_BATCH_SIZE = 1000
+TRUE_VALUES = {'1', 'true', 'vrai', 'oui', 'yes', 'x'}
+
+EXAM_FIELDS = ['title', 'description', 'duration', 'passing_score', 'is_active']
+QUESTION_FIELDS = ['exam', 'text', 'points', 'order']
+CHOICE_FIELDS = ['question', 'text', 'is_correct']
+
+
+class ExamImportError(ValueError):
+    """Fichier d'import invalide (la liste des erreurs est dans .errors)"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f'{len(errors)} erreur(s) dans le fichier importé')
+
+
+def load_file(path):
+    """Lit un fichier .json ou .csv et retourne la liste des examens"""
+    with open(path, encoding='utf-8-sig', newline='') as source:
+        if path.lower().endswith('.csv'):
+            return load_csv(source)
+        return load_json(source)
+
+
+def load_json(source):
+    data = json.load(source)
+    exams = data.get('exams') if isinstance(data, dict) else data
+    if not isinstance(exams, list):
+        raise ExamImportError(['La racine doit être une liste d\'examens ou {"exams": [...]}'])
+    return exams
+
+
+def load_csv(source):
+    """Regroupe les lignes (une par choix) en examens → questions → choix"""
+    reader = csv.DictReader(source)
+    missing = {'exam_id', 'question_id'} - set(reader.fieldnames or [])
+    if missing:
+        raise ExamImportError([f'Colonne(s) manquante(s) : {", ".join(sorted(missing))}'])
+    exams = {}
+    for row in reader:
+        exam = exams.setdefault(row['exam_id'], {
+            'external_id': row['exam_id'],
+            'title': row.get('exam_title'),
+            'description': row.get('exam_description', ''),
+            'duration': row.get('exam_duration'),
+            'passing_score': row.get('exam_passing_score') or 60,
+            'is_active': row.get('exam_is_active') or 'true',
+            'questions': {},
+        })
+        question = exam['questions'].setdefault(row['question_id'], {
+            'external_id': row['question_id'],
+            'text': row.get('question_text'),
+            'points': row.get('question_points') or 1,
+            'order': row.get('question_order') or 0,
+            'choices': [],
+        })
+        question['choices'].append({
+            'external_id': row.get('choice_id') or None,
+            'text': row.get('choice_text'),
+            'is_correct': row.get('is_correct', ''),
+        })
+    for exam in exams.values():
+        exam['questions'] = list(exam['questions'].values())
+    return list(exams.values())
+
+
+def _boolean(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def build_objects(exams):
+    """
+    Valide les données et retourne (examens, questions, choix) non
+    sauvegardés, reliés par external_id. Lève ExamImportError.
+    """
+    errors = []
+    exam_objects, question_objects, choice_objects = [], [], []
+    seen = set()
+
+    def check_unique(key, where):
+        if key in seen:
+            errors.append(f'{where} : identifiant en double « {key} »')
+        seen.add(key)
+
+    def check_type(value, expected, where):
+        """Structure du fichier : objet ({...}) ou liste ([...]) attendu"""
+        if isinstance(value, expected):
+            return True
+        label = 'un objet' if expected is dict else 'une liste'
+        errors.append(f'{where} : {label} attendu(e), {type(value).__name__} trouvé')
+        return False
+
+    if not check_type(exams, list, 'Fichier'):
+        raise ExamImportError(errors)
+
+    for exam_index, data in enumerate(exams, 1):
+        if not check_type(data, dict, f'Examen {exam_index}'):
+            continue
+        exam_key = str(data.get('external_id') or '').strip()
+        where = f'Examen {exam_key or exam_index}'
+        if not exam_key:
+            errors.append(f'{where} : external_id manquant')
+            continue
+        check_unique(('exam', exam_key), where)
+        try:
+            exam = Exam(
+                external_id=exam_key,
+                title=data['title'],
+                description=data.get('description') or '',
+                duration=int(data['duration']),
+                passing_score=int(data.get('passing_score', 60)),
+                is_active=_boolean(data.get('is_active', True)),
+            )
+        except (KeyError, TypeError, ValueError) as error:
+            errors.append(f'{where} : champ manquant ou invalide ({error})')
+            continue
+        if not exam.title:
+            errors.append(f'{where} : titre manquant')
+        exam_objects.append(exam)
+
+        questions = data.get('questions') or []
+        if not check_type(questions, list, f'{where}, questions'):
+            continue
+        for question_index, question_data in enumerate(questions, 1):
+            if not check_type(question_data, dict, f'{where}, question {question_index}'):
+                continue
+            question_key = str(question_data.get('external_id') or f'{exam_key}/{question_index}')
+            where = f'Question {question_key}'
+            check_unique(('question', question_key), where)
+            try:
+                question = Question(
+                    external_id=question_key,
+                    text=question_data['text'],
+                    points=int(question_data.get('points', 1)),
+                    order=int(question_data.get('order', question_index)),
+                )
+            except (KeyError, TypeError, ValueError) as error:
+                errors.append(f'{where} : champ manquant ou invalide ({error})')
+                continue
+            question.exam_key = exam_key
+            question_objects.append(question)
+
+            choices = question_data.get('choices') or []
+            if not check_type(choices, list, f'{where}, choix'):
+                continue
+            if not all(check_type(choice, dict, f'{where}, choix {index}') for index, choice in enumerate(choices, 1)):
+                continue
+            correct = sum(_boolean(choice.get('is_correct', False)) for choice in choices)
+            if len(choices) < 2:
+                errors.append(f'{where} : au moins deux choix sont nécessaires')
+            if correct != 1:
+                errors.append(f'{where} : {correct} bonne(s) réponse(s), exactement une attendue')
+
+            for choice_index, choice_data in enumerate(choices, 1):
+                choice_key = str(choice_data.get('external_id') or f'{question_key}/{choice_index}')
+                check_unique(('choice', choice_key), f'Choix {choice_key}')
+                if not choice_data.get('text'):
+                    errors.append(f'Choix {choice_key} : texte manquant')
+                choice = Choice(
+                    external_id=choice_key,
+                    text=choice_data.get('text') or '',
+                    is_correct=_boolean(choice_data.get('is_correct', False)),
+                )
+                choice.question_key = question_key
+                choice_objects.append(choice)
+
+    if errors:
+        raise ExamImportError(errors)
+    return exam_objects, question_objects, choice_objects
+
+
+def _upsert(model, objects, update_fields, batch_size):
+    """
+    Insère ou met à jour par external_id, puis retourne {external_id: pk}
+    (relu en base : MySQL ne renvoie pas les clés des lignes insérées).
+    """
+    # MySQL ne permet pas de préciser la contrainte ciblée par l'upsert
+    unique_fields = None
+    if connection.features.supports_update_conflicts_with_target:
+        unique_fields = ['external_id']
+    for start in range(0, len(objects), batch_size):
+        model.objects.bulk_create(
+            objects[start:start + batch_size],
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=update_fields,
+        )
+
+    keys = [obj.external_id for obj in objects]
+    ids = {}
+    for start in range(0, len(keys), batch_size):
+        ids.update(
+            model.objects.filter(external_id__in=keys[start:start + batch_size])
+            .values_list('external_id', 'pk')
+        )
+    return ids
+
+
+def _current_exam_ids(question_objects, choice_objects, batch_size):
+    """
+    Examens qui contiennent déjà les questions et choix importés : une
+    question (ou un choix) peut changer d'examen, l'ancien doit aussi être
+    recalculé.
+    """
+    exam_ids = set()
+    keys = [question.external_id for question in question_objects]
+    for start in range(0, len(keys), batch_size):
+        exam_ids.update(
+            Question.objects.filter(external_id__in=keys[start:start + batch_size])
+            .values_list('exam_id', flat=True)
+        )
+    keys = [choice.external_id for choice in choice_objects]
+    for start in range(0, len(keys), batch_size):
+        exam_ids.update(
+            Choice.objects.filter(external_id__in=keys[start:start + batch_size])
+            .values_list('question__exam_id', flat=True)
+        )
+    return exam_ids
+
+
+def import_exams(exams, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Importe (ou met à jour) les examens dans une transaction.
+    Retourne {'exams': n, 'questions': n, 'choices': n}.
+    """
+    from .aggregates import refresh_exam_aggregates
+    from .counters import refresh_active_exams
+    from .versions import bump_exam_catalog_version
+
+    exam_objects, question_objects, choice_objects = build_objects(exams)
+
+    with transaction.atomic():
+        previous_exam_ids = _current_exam_ids(question_objects, choice_objects, batch_size)
+        exam_ids = _upsert(Exam, exam_objects, EXAM_FIELDS, batch_size)
+        for question in question_objects:
+            question.exam_id = exam_ids[question.exam_key]
+        question_ids = _upsert(Question, question_objects, QUESTION_FIELDS, batch_size)
+        for choice in choice_objects:
+            choice.question_id = question_ids[choice.question_key]
+        choice_ids = _upsert(Choice, choice_objects, CHOICE_FIELDS, batch_size)
+
+        # Corrigé : les choix d'une question importée absents du fichier ne
+        # sont plus de bonnes réponses (sinon deux bonnes réponses possibles)
+        correct_ids = {choice_ids[choice.external_id] for choice in choice_objects if choice.is_correct}
+        imported_questions = list(question_ids.values())
+        for start in range(0, len(imported_questions), batch_size):
+            marked = Choice.objects.filter(
+                question_id__in=imported_questions[start:start + batch_size], is_correct=True
+            ).values_list('pk', flat=True)
+            stale = [pk for pk in marked if pk not in correct_ids]
+            if stale:
+                Choice.objects.filter(pk__in=stale).update(is_correct=False)
+
+        # bulk_create ne déclenche pas les signaux : agrégats, compteurs et
+        # version du catalogue (fragments de la liste des examens)
+        refresh_exam_aggregates(list(previous_exam_ids | set(exam_ids.values())))
+        refresh_active_exams()
+        transaction.on_commit(bump_exam_catalog_version)
+
+    return {
+        'exams': len(exam_objects),
+        'questions': len(question_objects),
+        'choices': len(choice_objects),
+    }
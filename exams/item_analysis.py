@@ -0,0 +1,146 @@
+"""
+Analyse d'items (statistiques classiques par question) d'un examen.
+
+Les réponses des sessions terminées sont lues par blocs dans des tableaux
+NumPy, converties en une matrice sessions × questions (1 = bonne réponse),
+puis tous les indicateurs sont calculés en une passe vectorisée :
+- difficulté : proportion de bonnes réponses
+- corrélation point-bisériale corrigée (question vs score sans la question)
+- indice de discrimination : p(27 % meilleurs) - p(27 % moins bons)
+- fréquence de chaque choix (distracteurs)
+"""
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .content_cache import content_version, get_exam_content
+from .models import Answer
+from .versions import exam_results_version
+
+DEFAULT_CHUNK_SIZE = 50000
+GROUP_FRACTION = 0.27
+
+
+def load_answers(exam, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Retourne (session_ids, question_ids, choice_ids) des sessions terminées"""
+    rows = (
+        Answer.objects
+        .filter(session__exam=exam, session__status='completed')
+        .order_by()
+        .values_list('session_id', 'question_id', 'choice_id')
+        .iterator(chunk_size=chunk_size)
+    )
+    chunks = []
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        chunks.append(np.array(chunk, dtype=np.int64))
+    if not chunks:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.int64)
+    data = np.concatenate(chunks)
+    return data[:, 0], data[:, 1], data[:, 2]
+
+
+def compute_item_analysis(exam, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Calcule l'analyse d'items d'un examen (sans cache)"""
+    content = get_exam_content(exam)
+    questions = content['questions']
+    question_ids = np.array([question['id'] for question in questions], dtype=np.int64)
+    points = np.array([question['points'] for question in questions], dtype=np.float64)
+    correct_ids = np.fromiter(content['correct_choices'], dtype=np.int64)
+
+    session_ids, answer_question_ids, choice_ids = load_answers(exam, chunk_size)
+
+    # Ne garder que les réponses aux questions actuelles de l'examen
+    known = np.isin(answer_question_ids, question_ids)
+    session_ids, choice_ids = session_ids[known], choice_ids[known]
+    answer_question_ids = answer_question_ids[known]
+    order = np.argsort(question_ids)
+    columns = order[np.searchsorted(question_ids, answer_question_ids, sorter=order)]
+
+    # Matrice sessions × questions
+    sessions, rows = np.unique(session_ids, return_inverse=True)
+    n_sessions, n_questions = len(sessions), len(question_ids)
+    correct = np.zeros((n_sessions, n_questions), dtype=np.float64)
+    correct[rows, columns] = np.isin(choice_ids, correct_ids)
+
+    items = []
+    if n_sessions:
+        totals = correct @ points
+        rest = totals[:, None] - correct * points[None, :]
+        difficulty = correct.mean(axis=0)
+
+        # Corrélation point-bisériale corrigée, vectorisée sur les colonnes
+        x = correct - difficulty
+        y = rest - rest.mean(axis=0)
+        denominator = np.sqrt((x ** 2).sum(axis=0) * (y ** 2).sum(axis=0))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            point_biserial = np.where(denominator > 0, (x * y).sum(axis=0) / denominator, np.nan)
+
+        # Indice de discrimination (groupes extrêmes de 27 %)
+        group = max(1, int(round(n_sessions * GROUP_FRACTION)))
+        ranking = np.argsort(totals, kind='stable')
+        discrimination = correct[ranking[-group:]].mean(axis=0) - correct[ranking[:group]].mean(axis=0)
+
+        # Fréquences des choix : seulement les choix actuels de la question
+        # répondue (un choix supprimé ou déplacé depuis n'est pas compté)
+        choice_question = content['choice_question']
+        all_choice_ids = np.array(sorted(choice_question), dtype=np.int64)
+        owners = np.array([choice_question[choice_id] for choice_id in all_choice_ids.tolist()], dtype=np.int64)
+        valid = np.isin(choice_ids, all_choice_ids)
+        positions = np.searchsorted(all_choice_ids, choice_ids[valid])
+        positions = positions[owners[positions] == answer_question_ids[valid]]
+        choice_counts = np.bincount(positions, minlength=len(all_choice_ids))
+        counts_by_choice = dict(zip(all_choice_ids.tolist(), choice_counts.tolist()))
+        answered = np.bincount(columns, minlength=n_questions)
+    else:
+        difficulty = point_biserial = discrimination = np.full(n_questions, np.nan)
+        counts_by_choice = {}
+        answered = np.zeros(n_questions, dtype=np.int64)
+
+    for index, question in enumerate(questions):
+        choices = []
+        for choice in question['choices']:
+            count = counts_by_choice.get(choice['id'], 0)
+            choices.append({
+                'id': choice['id'],
+                'text': choice['text'],
+                'is_correct': choice['id'] in content['correct_choices'],
+                'count': count,
+                'share': round(count / n_sessions, 4) if n_sessions else None,
+            })
+        items.append({
+            'question_id': question['id'],
+            'text': question['text'],
+            'points': question['points'],
+            'answered': int(answered[index]),
+            'difficulty': _round(difficulty[index]),
+            'point_biserial': _round(point_biserial[index]),
+            'discrimination': _round(discrimination[index]),
+            'choices': choices,
+        })
+
+    return {
+        'exam_id': exam.pk,
+        'sessions': n_sessions,
+        'questions': n_questions,
+        'items': items,
+    }
+
+
+def get_item_analysis(exam, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Analyse d'items en cache (invalidée par une nouvelle session terminée ou un changement de contenu)"""
+    key = f'exam_items:{exam.pk}:{content_version(exam)}:{exam_results_version(exam.pk)}'
+    report = cache.get(key)
+    if report is None:
+        report = compute_item_analysis(exam, chunk_size)
+        cache.set(key, report, getattr(settings, 'EXAM_ANALYTICS_CACHE_TIMEOUT', 24 * 60 * 60))
+    return report
+
+
+def _round(value):
+    value = float(value)
+    return None if np.isnan(value) else round(value, 4)
@@ -0,0 +1,115 @@
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils.deprecation import MiddlewareMixin
+from exams.replacements import ManualSessionMiddleware, SESSION_COOKIE_NAME
+
+
+class LegacySessionMiddleware(MiddlewareMixin):
+    """Ancienne version de ManualSessionMiddleware (référence « avant »)"""
+
+    def process_request(self, request):
+        session_key = request.COOKIES.get(SESSION_COOKIE_NAME)
+        if session_key:
+            try:
+                Session.objects.get(session_key=session_key)
+                request.session = SessionStore(session_key)
+            except Session.DoesNotExist:
+                request.session = SessionStore()
+        else:
+            request.session = SessionStore()
+
+    def process_response(self, request, response):
+        if hasattr(request, 'session'):
+            if request.session.modified or request.session.is_empty():
+                request.session.save()
+            response.set_cookie(SESSION_COOKIE_NAME, request.session.session_key, max_age=3600)
+        return response
+
+
+def view_ignoring_session(request):
+    return HttpResponse('ok')
+
+
+def view_reading_session(request):
+    request.session.get('_auth_user_id')
+    return HttpResponse('ok')
+
+
+def view_writing_session(request):
+    request.session['last_page'] = request.path
+    return HttpResponse('ok')
+
+
+# (nom, vue, cookie : None | 'valid' | 'invalid')
+SCENARIOS = [
+    ('Anonyme, session non utilisée', view_ignoring_session, None),
+    ('Anonyme, lecture de session', view_reading_session, None),
+    ('Connecté, session non utilisée', view_ignoring_session, 'valid'),
+    ('Connecté, lecture de session', view_reading_session, 'valid'),
+    ('Connecté, écriture de session', view_writing_session, 'valid'),
+    ('Cookie invalide, lecture', view_reading_session, 'invalid'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Compare le nombre de requêtes SQL par requête HTTP avant/après ManualSessionMiddleware paresseux'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help='Requêtes par scénario')
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        factory = RequestFactory()
+
+        self.stdout.write(self.style.SUCCESS('🚀 Benchmark du middleware de session manuel...\n'))
+        self.stdout.write(f"{'Scénario':<34} {'Avant':>12} {'Après':>12} {'Cookies (av./ap.)':>20}")
+        self.stdout.write('-' * 82)
+
+        totals = {'before': 0, 'after': 0}
+        # Tout est annulé à la fin : aucune session de test ne reste en base
+        with transaction.atomic():
+            for name, view, cookie in SCENARIOS:
+                before = self.measure(LegacySessionMiddleware, view, cookie, factory, repeat)
+                after = self.measure(ManualSessionMiddleware, view, cookie, factory, repeat)
+                totals['before'] += before[0]
+                totals['after'] += after[0]
+                self.stdout.write(
+                    f'{name:<34} {before[0] / repeat:>9.2f} q/r {after[0] / repeat:>9.2f} q/r'
+                    f'{before[1]:>11} / {after[1]:<8}'
+                )
+            transaction.set_rollback(True)
+
+        self.stdout.write('-' * 82)
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✅ Total : {totals['before']} requêtes SQL avant, {totals['after']} après "
+            f"({len(SCENARIOS) * repeat} requêtes HTTP par version)"
+        ))
+
+    def measure(self, middleware_class, view, cookie, factory, repeat):
+        """Retourne (requêtes SQL, cookies envoyés) pour `repeat` requêtes"""
+        middleware = middleware_class(view)
+        session_key = None
+        if cookie == 'valid':
+            store = SessionStore()
+            store['_auth_user_id'] = '1'
+            store.create()
+            session_key = store.session_key
+        elif cookie == 'invalid':
+            session_key = 'x' * 32
+
+        queries = 0
+        cookies = 0
+        for _ in range(repeat):
+            request = factory.get('/benchmark/')
+            if session_key:
+                request.COOKIES[SESSION_COOKIE_NAME] = session_key
+            with CaptureQueriesContext(connection) as ctx:
+                response = middleware(request)
+            queries += len(ctx.captured_queries)
+            cookies += SESSION_COOKIE_NAME in response.cookies
+        return queries, cookies
@@ -0,0 +1,218 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from exams import urls as exam_urls
+from exams.dataset import DEFAULT_PASSWORD, DatasetGenerator
+from exams.models import Exam, ExamSession
+
+# Budgets par scénario : nombre max de requêtes SQL et p95 max (ms).
+# Le nombre de requêtes est déterministe (détection des N+1) ; les temps
+# sont volontairement larges, ils dépendent de la machine. exam_list et
+# exam_detail sont mesurés fragments en cache (remplis par la chauffe).
+BUDGETS = {
+    'home (anonyme)': {'queries': 0, 'p95_ms': 100},
+    'register': {'queries': 0, 'p95_ms': 100},
+    'login': {'queries': 0, 'p95_ms': 100},
+    'login (POST)': {'queries': 9, 'p95_ms': 1500},
+    'home': {'queries': 2, 'p95_ms': 100},
+    'exam_list': {'queries': 2, 'p95_ms': 150},
+    'exam_detail': {'queries': 3, 'p95_ms': 100},
+    'start_exam': {'queries': 7, 'p95_ms': 100},
+    'take_exam': {'queries': 5, 'p95_ms': 150},
+    'take_exam (POST)': {'queries': 14, 'p95_ms': 250},
+    'autosave_answer': {'queries': 4, 'p95_ms': 100},
+    'exam_result': {'queries': 4, 'p95_ms': 100},
+    'my_results': {'queries': 3, 'p95_ms': 150},
+    'dashboard': {'queries': 4, 'p95_ms': 100},
+    'exam_analytics': {'queries': 3, 'p95_ms': 500},
+    # 2 requêtes par page de 100 sessions (pagination par clé) : ~300 sessions
+    'export_results': {'queries': 9, 'p95_ms': 2000},
+    'middleware_demo': {'queries': 2, 'p95_ms': 100},
+    'logout': {'queries': 4, 'p95_ms': 100},
+}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark des vues (temps, requêtes SQL, taille) sur une base de test générée, avec budgets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help='Mesures par scénario')
+        parser.add_argument('--warmup', type=int, default=2, help='Requêtes de chauffe (non mesurées)')
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--exams', type=int, default=10)
+        parser.add_argument('--questions', type=int, default=20)
+        parser.add_argument('--sessions', type=int, default=3000)
+        parser.add_argument('--logs', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', default='benchmark_views.json', help='Fichier de résultats JSON')
+        parser.add_argument('--budgets', help='Fichier JSON de budgets (remplace les valeurs par défaut)')
+        parser.add_argument('--no-budgets', action='store_true', help='Mesurer sans vérifier les budgets')
+
+    def handle(self, *args, **options):
+        budgets = dict(BUDGETS)
+        if options['budgets']:
+            with open(options['budgets'], encoding='utf-8') as source:
+                budgets.update(json.load(source))
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.stdout.write(self.style.SUCCESS('🏭 Génération du jeu de données de test...'))
+            DatasetGenerator(
+                users=options['users'], exams=options['exams'], questions=options['questions'],
+                sessions=options['sessions'], logs=options['logs'], seed=options['seed'],
+                prefix='bench',
+                progress=lambda message: self.stdout.write(f'  ⏱️  {message}'),
+            ).generate()
+            results = self.run_scenarios(options['repeat'], options['warmup'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        failures = self.report(results, {} if options['no_budgets'] else budgets)
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            json.dump({'results': results, 'failures': failures}, output, ensure_ascii=False, indent=2)
+        self.stdout.write(f'\n💾 Résultats écrits dans {options["output"]}')
+
+        if failures:
+            raise CommandError(f'{len(failures)} budget(s) dépassé(s) : ' + ' ; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('✅ Tous les budgets sont respectés'))
+
+    def run_scenarios(self, repeat, warmup):
+        """Exécute chaque scénario et retourne {nom: mesures}"""
+        # Étudiant avec au moins une session terminée et un examen non commencé
+        session = (
+            ExamSession.objects.filter(status='completed', user__username__startswith='bench_')
+            .order_by('pk').select_related('user').first()
+        )
+        user = session.user
+        user.is_staff = True
+        user.save(update_fields=['is_staff'])
+        taken = ExamSession.objects.filter(user=user).values_list('exam_id', flat=True)
+        new_exam = Exam.objects.exclude(pk__in=taken).order_by('pk').first()
+        if new_exam is None:
+            raise CommandError('Aucun examen non commencé pour l\'utilisateur de test (augmentez --exams)')
+        credentials = {'username': user.username, 'password': DEFAULT_PASSWORD}
+
+        anonymous = Client()
+        client = Client()
+        client.post(reverse('login'), credentials)
+
+        def login():
+            client.post(reverse('login'), credentials)
+
+        def logout():
+            client.get(reverse('logout'))
+
+        def start():
+            client.get(reverse('start_exam', args=[new_exam.pk]))
+
+        answers = {
+            f'question_{question.pk}': question.choices.all()[0].pk
+            for question in new_exam.questions.prefetch_related('choices')
+        }
+        question_id, choice_id = next(iter(answers.items()))
+        autosave = {'question': int(question_id[len('question_'):]), 'choice': choice_id}
+        exam_id = session.exam_id
+        # (nom, client, méthode, url, arguments du client, préparation, annulé)
+        scenarios = [
+            ('home (anonyme)', anonymous, 'get', reverse('home'), None, None, False),
+            ('register', anonymous, 'get', reverse('register'), None, None, False),
+            ('login', anonymous, 'get', reverse('login'), None, None, False),
+            ('login (POST)', client, 'post', reverse('login'), {'data': credentials}, logout, False),
+            ('home', client, 'get', reverse('home'), None, None, False),
+            ('exam_list', client, 'get', reverse('exam_list'), None, None, False),
+            ('exam_detail', client, 'get', reverse('exam_detail', args=[exam_id]), None, None, False),
+            ('start_exam', client, 'get', reverse('start_exam', args=[new_exam.pk]), None, None, False),
+            ('take_exam', client, 'get', reverse('take_exam', args=[new_exam.pk]), None, start, False),
+            ('take_exam (POST)', client, 'post', reverse('take_exam', args=[new_exam.pk]),
+             {'data': answers}, start, True),
+            ('autosave_answer', client, 'post', reverse('autosave_answer', args=[new_exam.pk]),
+             {'data': autosave, 'content_type': 'application/json'}, start, True),
+            ('exam_result', client, 'get', reverse('exam_result', args=[session.pk]), None, None, False),
+            ('my_results', client, 'get', reverse('my_results'), None, None, False),
+            ('dashboard', client, 'get', reverse('dashboard'), None, None, False),
+            ('exam_analytics', client, 'get', reverse('exam_analytics', args=[exam_id]), None, None, False),
+            ('export_results', client, 'get', f"{reverse('export_results')}?exam={exam_id}", None, None, False),
+            ('middleware_demo', client, 'get', reverse('middleware_demo'), None, None, False),
+            ('logout', client, 'get', reverse('logout'), None, login, False),
+        ]
+
+        covered = {name.split(' ')[0] for name, *_ in scenarios}
+        missing = {pattern.name for pattern in exam_urls.urlpatterns} - covered
+        if missing:
+            self.stdout.write(self.style.WARNING(f'⚠️  URLs sans scénario : {", ".join(sorted(missing))}'))
+
+        self.stdout.write(self.style.SUCCESS(f'\n🚀 {len(scenarios)} scénarios × {repeat} mesures\n'))
+        results = {}
+        for name, http, method, url, arguments, prepare, rollback in scenarios:
+            timings, queries, sizes, statuses = [], [], [], set()
+            for run in range(warmup + repeat):
+                if prepare:
+                    prepare()
+                elapsed, count, size, status = self.measure(http, method, url, arguments or {}, rollback)
+                if run >= warmup:
+                    timings.append(elapsed)
+                    queries.append(count)
+                    sizes.append(size)
+                    statuses.add(status)
+            results[name] = {
+                'url': url,
+                'method': method.upper(),
+                'status': sorted(statuses),
+                'median_ms': round(statistics.median(timings), 2),
+                'p95_ms': round(_percentile(timings, 95), 2),
+                'queries': max(queries),
+                'size': max(sizes),
+            }
+        return results
+
+    def measure(self, http, method, url, arguments, rollback):
+        """Retourne (durée en ms, requêtes SQL, taille en octets, statut)"""
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = getattr(http, method)(url, **arguments)
+                if response.streaming:
+                    size = sum(len(chunk) for chunk in response.streaming_content)
+                else:
+                    size = len(response.content)
+                elapsed = (time.perf_counter() - start) * 1000
+            # Les requêtes qui modifient l'état sont annulées pour être rejouées
+            transaction.set_rollback(rollback)
+        return elapsed, len(ctx.captured_queries), size, response.status_code
+
+    def report(self, results, budgets):
+        """Affiche le tableau des résultats ; retourne la liste des dépassements"""
+        failures = []
+        self.stdout.write(f"{'Scénario':<20} {'Statut':>8} {'Médiane':>10} {'p95':>10} {'Requêtes':>9} {'Taille':>10}")
+        self.stdout.write('-' * 72)
+        for name, result in results.items():
+            budget = budgets.get(name, {})
+            over = []
+            if 'queries' in budget and result['queries'] > budget['queries']:
+                over.append(f"{result['queries']} requêtes > {budget['queries']}")
+            if 'p95_ms' in budget and result['p95_ms'] > budget['p95_ms']:
+                over.append(f"p95 {result['p95_ms']} ms > {budget['p95_ms']} ms")
+            failures.extend(f'{name} : {message}' for message in over)
+
+            line = (
+                f"{name:<20} {'/'.join(map(str, result['status'])):>8} {result['median_ms']:>7.1f} ms "
+                f"{result['p95_ms']:>7.1f} ms {result['queries']:>9} {result['size']:>10}"
+            )
+            self.stdout.write(self.style.ERROR(f'{line}  ❌ {", ".join(over)}') if over else line)
+        return failures
+
+
+def _percentile(values, percentile):
+    values = sorted(values)
+    index = (len(values) - 1) * percentile / 100
+    low = int(index)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (index - low)
@@ -0,0 +1,45 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from exams.export import DEFAULT_CHUNK_SIZE, FORMATS, iter_export, parse_bound
+
+
+class Command(BaseCommand):
+    help = 'Exporte les sessions terminées et leurs réponses en CSV ou JSONL (streaming)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default='csv', help='Format de sortie')
+        parser.add_argument('--exam', type=int, help='Limiter à un examen (id)')
+        parser.add_argument('--since', help='Sessions terminées à partir de cette date (AAAA-MM-JJ ou ISO 8601)')
+        parser.add_argument('--until', help='Sessions terminées jusqu\'à cette date incluse')
+        parser.add_argument('--output', '-o', help='Fichier de sortie (sortie standard par défaut)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Nombre de sessions lues par page')
+
+    def handle(self, *args, **options):
+        try:
+            since = parse_bound(options['since'])
+            until = parse_bound(options['until'], end=True)
+        except ValueError as error:
+            raise CommandError(error)
+
+        chunks = iter_export(
+            options['format'],
+            exam_id=options['exam'],
+            since=since,
+            until=until,
+            chunk_size=options['chunk_size'],
+        )
+        start = time.perf_counter()
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                size = sum(output.write(chunk) for chunk in chunks)
+        else:
+            size = sum(sys.stdout.write(chunk) for chunk in chunks)
+        elapsed = time.perf_counter() - start
+
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ Export écrit dans {options["output"]} ({size / 1024:.0f} Ko en {elapsed:.2f}s)'
+            ))
@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from exams.dataset import DEFAULT_BATCH_SIZE, DEFAULT_PASSWORD, generate_dataset
+
+
+class Command(BaseCommand):
+    help = 'Génère un jeu de données synthétique reproductible (charge et benchmarks)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Nombre d\'utilisateurs')
+        parser.add_argument('--exams', type=int, default=20, help='Nombre d\'examens')
+        parser.add_argument('--questions', type=int, default=20, help='Questions par examen')
+        parser.add_argument('--choices', type=int, default=4, help='Choix par question')
+        parser.add_argument('--sessions', type=int, default=10000,
+                            help='Sessions d\'examen (au plus une par utilisateur et par examen)')
+        parser.add_argument('--logs', type=int, default=50000, help='Lignes du journal des requêtes')
+        parser.add_argument('--days', type=int, default=90, help='Période couverte (jours)')
+        parser.add_argument('--seed', type=int, default=42, help='Graine du générateur aléatoire')
+        parser.add_argument('--prefix', default='gen', help='Préfixe des utilisateurs et examens générés')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Nombre de lignes insérées par requête')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🏭 Génération du jeu de données...'))
+        start = time.perf_counter()
+        try:
+            counts = generate_dataset(
+                users=options['users'],
+                exams=options['exams'],
+                questions=options['questions'],
+                choices=options['choices'],
+                sessions=options['sessions'],
+                logs=options['logs'],
+                days=options['days'],
+                seed=options['seed'],
+                prefix=options['prefix'],
+                batch_size=options['batch_size'],
+                progress=lambda message: self.stdout.write(f'  ⏱️  {message}'),
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        elapsed = time.perf_counter() - start
+
+        rows = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✅ {rows} lignes créées en {elapsed:.2f}s ({rows / elapsed:.0f} lignes/s)'
+        ))
+        for table, count in counts.items():
+            self.stdout.write(f'  📦 {table} : {count}')
+        self.stdout.write(f'  🔑 Mot de passe des utilisateurs : {DEFAULT_PASSWORD}')
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from exams.grading import DEFAULT_BATCH_SIZE, grade_pending
+from exams.models import ExamSession
+
+
+class Command(BaseCommand):
+    help = 'Note par lots les sessions restées en attente de correction (statut « grading »)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=0,
+                            help='Ignorer les sessions soumises depuis moins de N secondes')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Nombre de sessions notées par lot')
+
+    def handle(self, *args, **options):
+        pending = ExamSession.objects.filter(status='grading').count()
+        self.stdout.write(self.style.SUCCESS(f'⏳ {pending} session(s) en attente de correction'))
+
+        start = time.perf_counter()
+        count = grade_pending(older_than=options['older_than'], batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - start
+
+        rate = count / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✅ {count} sessions notées en {elapsed:.2f}s ({rate:.0f} sessions/s)'
+        ))
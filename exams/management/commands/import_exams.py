@@ -0,0 +1,37 @@
+import time
+from json import JSONDecodeError
+
+from django.core.management.base import BaseCommand, CommandError
+from exams.importer import DEFAULT_BATCH_SIZE, ExamImportError, import_exams, load_file
+
+MAX_ERRORS_SHOWN = 20
+
+
+class Command(BaseCommand):
+    help = 'Importe (ou met à jour) une banque d\'examens depuis un fichier JSON ou CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Fichier .json ou .csv')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Nombre de lignes insérées par requête')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            exams = load_file(options['path'])
+            self.stdout.write(self.style.SUCCESS(f'📥 Import de {len(exams)} examens...'))
+            counts = import_exams(exams, batch_size=options['batch_size'])
+        except OSError as error:
+            raise CommandError(f'Lecture impossible : {error}')
+        except (ExamImportError, JSONDecodeError) as error:
+            for message in getattr(error, 'errors', [str(error)])[:MAX_ERRORS_SHOWN]:
+                self.stderr.write(f'  ❌ {message}')
+            raise CommandError(f'Import annulé : {error}')
+        elapsed = time.perf_counter() - start
+
+        rate = counts['questions'] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✅ {counts["exams"]} examens, {counts["questions"]} questions, '
+            f'{counts["choices"]} choix importés en {elapsed:.2f}s ({rate:.0f} questions/s)'
+        ))
+
@@ -0,0 +1,98 @@
+import re
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from exams.models import Answer, Choice, Exam, ExamSession, Question, RequestLog
+
+# Motifs signalés dans les plans, par moteur : (libellé, expression)
+PLAN_ISSUES = {
+    'sqlite': [
+        ('parcours complet', re.compile(r'\bSCAN (?!.*\bUSING\b)')),
+        ('tri sans index', re.compile(r'USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)')),
+    ],
+    'mysql': [
+        ('parcours complet', re.compile(r'\bALL\b')),
+        ('tri sans index', re.compile(r'Using filesort')),
+        ('table temporaire', re.compile(r'Using temporary')),
+    ],
+    'postgresql': [
+        ('parcours complet', re.compile(r'Seq Scan')),
+        ('tri sans index', re.compile(r'^\s*(->\s*)?Sort\b', re.MULTILINE)),
+    ],
+}
+
+
+def view_querysets(user, exam, session):
+    """Requêtes exécutées par les vues de exams.views (vue, description, queryset)"""
+    return [
+        ('exam_list', 'examens actifs', Exam.objects.filter(is_active=True)),
+        ('exam_list', 'examens déjà passés',
+         ExamSession.objects.filter(user=user, status='completed').order_by().values_list('exam_id', flat=True)),
+        ('exam_detail', 'session existante', ExamSession.objects.filter(user=user, exam=exam)[:1]),
+        ('take_exam', 'contenu : questions', Question.objects.filter(exam=exam)),
+        ('take_exam', 'contenu : choix', Choice.objects.filter(question__exam=exam)),
+        ('take_exam', 'réponses déjà données',
+         Answer.objects.filter(session=session).order_by().values_list('question_id', 'choice_id')),
+        ('exam_result', 'réponses de la session',
+         Answer.objects.filter(session=session).order_by().values_list('question_id', 'choice_id')),
+        ('my_results', 'sessions terminées',
+         ExamSession.objects.filter(user=user, status='completed').select_related('exam').order_by('-finished_at')),
+        ('dashboard', 'dernières sessions',
+         ExamSession.objects.filter(user=user).select_related('exam').order_by('-started_at')[:5]),
+        ('exam_analytics', 'scores de l\'examen',
+         ExamSession.objects.filter(exam=exam, status='completed', score__isnull=False)
+         .order_by().values_list('score', 'started_at', 'finished_at')),
+        ('middleware_demo', 'derniers logs',
+         RequestLog.objects.filter(user=user).order_by('-timestamp')[:10]),
+    ]
+
+
+def plan_issues(vendor, plan):
+    """Retourne les problèmes détectés dans un plan d'exécution"""
+    return [label for label, pattern in PLAN_ISSUES.get(vendor, []) if pattern.search(plan)]
+
+
+class Command(BaseCommand):
+    help = 'Analyse (EXPLAIN) les requêtes des vues et signale parcours complets et tris sans index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--strict', action='store_true', help='Échouer si un problème est détecté')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in PLAN_ISSUES:
+            raise CommandError(f'Moteur non pris en charge : {vendor}')
+
+        # Des objets existants si possible (MySQL simplifie les plans sur clé absente)
+        session = ExamSession.objects.order_by('pk').first()
+        user = session.user if session else (User.objects.order_by('pk').first() or User(pk=1))
+        exam = session.exam if session else (Exam.objects.order_by('pk').first() or Exam(pk=1))
+        session = session or ExamSession(pk=1)
+
+        self.stdout.write(self.style.SUCCESS(f'🔎 Plans d\'exécution ({vendor})\n'))
+        problems = 0
+        for view, description, queryset in view_querysets(user, exam, session):
+            plan = queryset.explain()
+            issues = plan_issues(vendor, plan)
+            problems += bool(issues)
+            label = f'{view:<16} {description:<26}'
+            if issues:
+                rows = queryset.model._default_manager.count()
+                self.stdout.write(self.style.WARNING(
+                    f'⚠️  {label} {", ".join(issues)} ({queryset.model._meta.db_table} : {rows} lignes)'
+                ))
+            else:
+                self.stdout.write(f'✅ {label} index utilisé')
+            if issues or options['verbosity'] >= 2:
+                for line in plan.splitlines():
+                    self.stdout.write(f'      {line}')
+
+        self.stdout.write('')
+        if problems:
+            message = f'{problems} requête(s) sans index adapté'
+            if options['strict']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(f'⚠️  {message}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ Toutes les requêtes utilisent un index'))
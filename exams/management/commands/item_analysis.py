@@ -0,0 +1,53 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from exams.item_analysis import DEFAULT_CHUNK_SIZE, compute_item_analysis, get_item_analysis
+from exams.models import Exam
+
+
+class Command(BaseCommand):
+    help = 'Analyse d\'items : difficulté, discrimination et distracteurs de chaque question'
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam', type=int, nargs='?', help='Examen à analyser (id), tous par défaut')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Nombre de réponses lues par bloc')
+        parser.add_argument('--no-cache', action='store_true', help='Recalculer sans lire le cache')
+        parser.add_argument('--json', action='store_true', help='Afficher le rapport en JSON')
+
+    def handle(self, *args, **options):
+        exams = Exam.objects.order_by('pk')
+        if options['exam']:
+            exams = exams.filter(pk=options['exam'])
+            if not exams:
+                raise CommandError(f'Examen {options["exam"]} introuvable')
+        analyse = compute_item_analysis if options['no_cache'] else get_item_analysis
+
+        for exam in exams:
+            start = time.perf_counter()
+            report = analyse(exam, chunk_size=options['chunk_size'])
+            elapsed = time.perf_counter() - start
+
+            if options['json']:
+                self.stdout.write(json.dumps(report, ensure_ascii=False))
+                continue
+
+            self.stdout.write(self.style.SUCCESS(
+                f'\n🔬 {exam.title} : {report["sessions"]} sessions, '
+                f'{report["questions"]} questions ({elapsed:.2f}s)'
+            ))
+            for number, item in enumerate(report['items'], 1):
+                self.stdout.write(
+                    f'  Q{number:<3} difficulté={_format(item["difficulty"])} '
+                    f'r_pbis={_format(item["point_biserial"])} '
+                    f'D={_format(item["discrimination"])}  {item["text"][:50]}'
+                )
+                for choice in item['choices']:
+                    mark = '✔' if choice['is_correct'] else ' '
+                    share = _format(choice['share'])
+                    self.stdout.write(f'       {mark} {choice["count"]:>6} ({share})  {choice["text"][:40]}')
+
+
+def _format(value):
+    return '   -' if value is None else f'{value:.2f}'
@@ -0,0 +1,160 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from projet9.loadtest import STEPS, run_load_test
+
+TOGGLES = ['USE_SESSION_MIDDLEWARE', 'USE_AUTH_MIDDLEWARE', 'USE_CSRF_MIDDLEWARE', 'USE_MESSAGES_MIDDLEWARE']
+PASSWORD = 'charge-123'
+
+
+class Command(BaseCommand):
+    help = 'Test de charge local : N étudiants virtuels passent un examen en parallèle'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=50, help='Nombre d\'étudiants virtuels')
+        parser.add_argument('--concurrency', type=int, default=10, help='Étudiants simultanés (threads)')
+        parser.add_argument('--think-time', type=float, default=1.0,
+                            help='Temps de réflexion moyen entre deux étapes (s, loi exponentielle)')
+        parser.add_argument('--ramp-up', type=float, default=0.0, help='Durée d\'arrivée des étudiants (s)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--max-error-rate', type=float, default=1.0,
+                            help='Taux d\'erreur maximal (%%) avant échec de la commande')
+        parser.add_argument('--output', help='Fichier de résultats JSON')
+        parser.add_argument('--keep-users', action='store_true',
+                            help='Conserver les utilisateurs créés et leurs sessions')
+        parser.add_argument('--compare', action='store_true',
+                            help='Comparer les configurations USE_*_MIDDLEWARE (un processus par configuration)')
+        parser.add_argument('--config', action='append', default=[],
+                            help='Configuration à comparer, ex. "SESSION=1,CSRF=0" (répétable, avec --compare)')
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            reports = self.compare(options)
+        else:
+            reports = {'actuelle': self.run(options)}
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(reports, output, ensure_ascii=False, indent=2)
+        if options['verbosity'] >= 1:
+            for name, report in reports.items():
+                self.print_report(name, report)
+            if len(reports) > 1:
+                self.print_comparison(reports)
+        self.check_thresholds(reports, options['max_error_rate'])
+
+    def run(self, options):
+        """Une exécution dans ce processus, avec des utilisateurs dédiés"""
+        prefix = f'load_{os.getpid()}_{int(time.time())}_'
+        usernames = [f'{prefix}{index}' for index in range(options['students'])]
+        password = make_password(PASSWORD)
+        User.objects.bulk_create([User(username=name, password=password) for name in usernames])
+        try:
+            report = run_load_test(
+                options['students'], options['concurrency'],
+                think_time=options['think_time'], ramp_up=options['ramp_up'],
+                seed=options['seed'], password=PASSWORD, usernames=usernames,
+            )
+            report['middlewares'] = {name: getattr(settings, name) for name in TOGGLES}
+        finally:
+            if not options['keep_users']:
+                # Un par un : les signaux de ExamSession mettent à jour les compteurs
+                for user in User.objects.filter(username__startswith=prefix):
+                    user.delete()
+        return report
+
+    def compare(self, options):
+        """Relance la commande dans un sous-processus par configuration"""
+        configs = {'actuelle': {}}
+        if options['config']:
+            for config in options['config']:
+                configs[config] = self.parse_config(config)
+        else:
+            # Par défaut : chaque interrupteur inversé par rapport à la configuration actuelle
+            for name in TOGGLES:
+                value = '0' if getattr(settings, name) else '1'
+                configs[f'{name[4:-11]}={value}'] = {name: value}
+
+        reports = {}
+        for name, overrides in configs.items():
+            self.stdout.write(self.style.SUCCESS(f'🚀 Configuration « {name} »...'))
+            with tempfile.NamedTemporaryFile(suffix='.json') as output:
+                command = [
+                    sys.executable, '-m', 'django', 'loadtest',
+                    '--students', str(options['students']),
+                    '--concurrency', str(options['concurrency']),
+                    '--think-time', str(options['think_time']),
+                    '--ramp-up', str(options['ramp_up']),
+                    '--seed', str(options['seed']),
+                    # Les seuils sont vérifiés ici, sur l'ensemble des configurations
+                    '--max-error-rate', '100',
+                    '--output', output.name,
+                    '--verbosity', '0',
+                ]
+                env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ['DJANGO_SETTINGS_MODULE'], **overrides}
+                result = subprocess.run(command, cwd=settings.BASE_DIR, env=env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+                if result.returncode:
+                    raise CommandError(f'Configuration « {name} » en échec :\n{result.stderr[-2000:]}')
+                reports[name] = json.load(output)['actuelle']
+        return reports
+
+    def parse_config(self, config):
+        overrides = {}
+        for item in config.split(','):
+            key, _, value = item.partition('=')
+            name = f'USE_{key.strip().upper()}_MIDDLEWARE'
+            if name not in TOGGLES or value.strip() not in ('0', '1'):
+                raise CommandError(f'Configuration invalide : « {item} » (ex. SESSION=1,CSRF=0)')
+            overrides[name] = value.strip()
+        return overrides
+
+    def check_thresholds(self, reports, max_error_rate):
+        """Échec de la commande si aucun parcours n'aboutit ou si trop d'erreurs"""
+        failures = []
+        for name, report in reports.items():
+            if not report['completed']:
+                failures.append(f'« {name} » : aucun parcours terminé')
+            elif report['error_rate'] > max_error_rate:
+                failures.append(f"« {name} » : {report['error_rate']}% d'erreurs > {max_error_rate}%")
+        if failures:
+            raise CommandError('Test de charge en échec : ' + ' ; '.join(failures))
+
+    def print_report(self, name, report):
+        manual = [key[4:-11].lower() for key, value in report['middlewares'].items() if not value]
+        self.stdout.write(self.style.SUCCESS(
+            f"\n📊 {name} (manuels : {', '.join(manual) or 'aucun'}) — "
+            f"{report['completed']}/{report['students']} parcours en {report['duration_s']}s, "
+            f"{report['flows_per_s']} parcours/s, {report['requests_per_s']} req/s, "
+            f"{report['error_rate']}% d'erreurs, {report['queries']} requêtes SQL"
+        ))
+        self.stdout.write(f"{'Étape':<14} {'Req.':>6} {'Erreurs':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'SQL/req':>8}  Statuts")
+        self.stdout.write('-' * 86)
+        for step in STEPS:
+            data = report['steps'][step]
+            self.stdout.write(
+                f"{step:<14} {data['requests']:>6} {data['error_rate']:>7.1f}% "
+                f"{_ms(data['p50_ms'])} {_ms(data['p95_ms'])} {_ms(data['p99_ms'])} {data['queries_per_request']:>8}  "
+                + ', '.join(f'{status}×{count}' for status, count in data['statuses'].items())
+            )
+
+    def print_comparison(self, reports):
+        self.stdout.write(self.style.SUCCESS('\n⚖️  Comparaison'))
+        self.stdout.write(f"{'Configuration':<24} {'Parcours/s':>11} {'Échecs':>7} {'p95 submit':>11} {'SQL':>8}")
+        for name, report in reports.items():
+            self.stdout.write(
+                f"{name:<24} {report['flows_per_s']:>11} {report['failed']:>7} "
+                f"{_ms(report['steps']['submit']['p95_ms']):>11} {report['queries']:>8}"
+            )
+
+
+def _ms(value):
+    return '        -' if value is None else f'{value:>6.1f} ms'
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+from exams.aggregates import refresh_exam_aggregates
+from exams.models import Exam
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les agrégats stockés des examens (nombre de questions, total des points)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_ids', nargs='*', type=int, help='Examens à recalculer (tous par défaut)')
+
+    def handle(self, *args, **options):
+        exams = Exam.objects.all()
+        if options['exam_ids']:
+            exams = exams.filter(pk__in=options['exam_ids'])
+
+        self.stdout.write(self.style.SUCCESS('🔄 Recalcul des agrégats des examens...'))
+        start = time.perf_counter()
+        count = refresh_exam_aggregates(exams)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'\n✅ {count} examens mis à jour en {elapsed:.2f}s'))
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+from exams.stats import rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les statistiques matérialisées des utilisateurs (tableau de bord)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', type=int, help='Utilisateurs à recalculer (tous par défaut)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('📊 Recalcul des statistiques utilisateurs...'))
+        start = time.perf_counter()
+        count = rebuild_user_stats(options['user_ids'] or None)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'\n✅ {count} utilisateurs mis à jour en {elapsed:.2f}s'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from exams import counters
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les compteurs globaux de la page d\'accueil depuis les tables sources'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🔢 Réconciliation des compteurs globaux...'))
+        values = counters.reconcile()
+        self.stdout.write(self.style.SUCCESS('\n✅ Compteurs recalculés :'))
+        for name, value in values.items():
+            self.stdout.write(f'  {name} = {value}')
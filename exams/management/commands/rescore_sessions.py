@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from exams.models import ExamSession
+from exams.scoring import DEFAULT_BATCH_SIZE, rescore_sessions
+from exams.stats import rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = 'Recalcule par lots le score des sessions d\'examen terminées'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, help='Limiter à un examen (id)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Nombre de sessions notées par requête')
+
+    def handle(self, *args, **options):
+        sessions = ExamSession.objects.filter(status='completed')
+        if options['exam']:
+            sessions = sessions.filter(exam_id=options['exam'])
+
+        self.stdout.write(self.style.SUCCESS('🧮 Recalcul des scores...'))
+        start = time.perf_counter()
+        count = rescore_sessions(sessions, batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - start
+
+        rate = count / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✅ {count} sessions recalculées en {elapsed:.2f}s ({rate:.0f} sessions/s)'
+        ))
+
+        # Les scores ont changé : statistiques des utilisateurs concernés
+        user_ids = None if not options['exam'] else sessions.values_list('user_id', flat=True).distinct()
+        users = rebuild_user_stats(user_ids)
+        self.stdout.write(f'  📊 Statistiques de {users} utilisateurs recalculées')
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.2 on 2026-10-17 05:53
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_exam_aggregates(apps, schema_editor):
+    Exam = apps.get_model('exams', 'Exam')
+    Question = apps.get_model('exams', 'Question')
+
+    def aggregate(expression):
+        return Coalesce(
+            Subquery(
+                Question.objects.filter(exam=OuterRef('pk'))
+                .order_by()
+                .values('exam')
+                .annotate(value=expression)
+                .values('value'),
+                output_field=IntegerField(),
+            ),
+            0,
+        )
+
+    Exam.objects.update(
+        num_questions=aggregate(Count('pk')),
+        num_points=aggregate(Sum('points')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='answer_key_version',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Version du corrigé'),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='num_points',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Total des points'),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='num_questions',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Nombre de questions'),
+        ),
+        migrations.RunPython(fill_exam_aggregates, migrations.RunPython.noop),
+    ]
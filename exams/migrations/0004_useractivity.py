@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-17 05:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('exams', '0003_requestlog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserActivity',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='activity', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+                ('last_activity', models.DateTimeField(verbose_name='Dernière activité')),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True, verbose_name='Adresse IP')),
+            ],
+            options={
+                'verbose_name': 'Activité utilisateur',
+                'verbose_name_plural': 'Activités utilisateurs',
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.2 on 2026-10-17 06:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('exams', '0004_useractivity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserExamStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='exam_stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+                ('exams_taken', models.IntegerField(default=0, verbose_name='Examens passés')),
+                ('exams_passed', models.IntegerField(default=0, verbose_name='Examens réussis')),
+                ('score_sum', models.FloatField(default=0, verbose_name='Somme des scores')),
+                ('best_score', models.FloatField(blank=True, null=True, verbose_name='Meilleur score (%)')),
+                ('last_score', models.FloatField(blank=True, null=True, verbose_name='Dernier score (%)')),
+                ('last_finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Dernier examen terminé le')),
+            ],
+            options={
+                'verbose_name': 'Statistiques utilisateur',
+                'verbose_name_plural': 'Statistiques utilisateurs',
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-17 06:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0006_globalcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='choice',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=200, null=True, unique=True, verbose_name='Identifiant externe'),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='external_id',
+            field=models.CharField(blank=True, help_text="Clé d'import (commande import_exams)", max_length=100, null=True, unique=True, verbose_name='Identifiant externe'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=150, null=True, unique=True, verbose_name='Identifiant externe'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-17 06:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0008_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='examsession',
+            name='status',
+            field=models.CharField(choices=[('in_progress', 'En cours'), ('grading', 'En correction'), ('completed', 'Terminé'), ('abandoned', 'Abandonné')], default='in_progress', max_length=20, verbose_name='Statut'),
+        ),
+    ]
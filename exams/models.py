@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, connection, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 
@@ -12,6 +12,15 @@ class Exam(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True, verbose_name="Actif")
     passing_score = models.IntegerField(default=60, verbose_name="Score de réussite (%)")
+    external_id = models.CharField(
+        max_length=100, unique=True, null=True, blank=True,
+        verbose_name="Identifiant externe", help_text="Clé d'import (commande import_exams)"
+    )
+    
+    # Agrégats dénormalisés, maintenus par exams/signals.py
+    num_questions = models.IntegerField(default=0, editable=False, verbose_name="Nombre de questions")
+    num_points = models.IntegerField(default=0, editable=False, verbose_name="Total des points")
+    answer_key_version = models.IntegerField(default=0, editable=False, verbose_name="Version du corrigé")
     
     class Meta:
         verbose_name = "Examen"
@@ -23,13 +32,13 @@ class Exam(models.Model):
     
     @property
     def total_questions(self):
-        """Retourne le nombre total de questions"""
-        return self.questions.count()
+        """Retourne le nombre total de questions (valeur stockée)"""
+        return self.num_questions
     
     @property
     def total_points(self):
-        """Retourne le total de points de l'examen"""
-        return sum(q.points for q in self.questions.all())
+        """Retourne le total de points de l'examen (valeur stockée)"""
+        return self.num_points
 
 
 class Question(models.Model):
@@ -43,11 +52,17 @@ class Question(models.Model):
     text = models.TextField(verbose_name="Question")
     points = models.IntegerField(default=1, verbose_name="Points")
     order = models.IntegerField(default=0, verbose_name="Ordre")
+    external_id = models.CharField(
+        max_length=150, unique=True, null=True, blank=True, verbose_name="Identifiant externe"
+    )
     
     class Meta:
         verbose_name = "Question"
         verbose_name_plural = "Questions"
         ordering = ['order', 'id']
+        indexes = [
+            models.Index(fields=['exam', 'order'], name='question_exam_order'),
+        ]
     
     def __str__(self):
         return f"{self.exam.title} - Q{self.order}: {self.text[:50]}"
@@ -68,6 +83,9 @@ class Choice(models.Model):
     )
     text = models.CharField(max_length=500, verbose_name="Choix")
     is_correct = models.BooleanField(default=False, verbose_name="Bonne réponse")
+    external_id = models.CharField(
+        max_length=200, unique=True, null=True, blank=True, verbose_name="Identifiant externe"
+    )
     
     class Meta:
         verbose_name = "Choix"
@@ -81,6 +99,7 @@ class ExamSession(models.Model):
     """Modèle pour représenter une session d'examen d'un utilisateur"""
     STATUS_CHOICES = [
         ('in_progress', 'En cours'),
+        ('grading', 'En correction'),
         ('completed', 'Terminé'),
         ('abandoned', 'Abandonné'),
     ]
@@ -113,6 +132,12 @@ class ExamSession(models.Model):
         verbose_name_plural = "Sessions d'examen"
         unique_together = ['user', 'exam']
         ordering = ['-started_at']
+        indexes = [
+            # my_results, exam_list : sessions terminées d'un utilisateur par date de fin
+            models.Index(fields=['user', 'status', '-finished_at'], name='session_user_status_finished'),
+            # dashboard : dernières sessions d'un utilisateur
+            models.Index(fields=['user', '-started_at'], name='session_user_started'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.exam.title} ({self.status})"
@@ -132,26 +157,110 @@ class ExamSession(models.Model):
             return self.score >= self.exam.passing_score
         return False
     
-    def calculate_score(self):
-        """Calcule le score de la session"""
-        total_points = self.exam.total_points
-        if total_points == 0:
-            return 0
+    def calculate_score(self, content=None):
+        """
+        Calcule le score de la session : à partir du contenu en cache de
+        l'examen s'il est fourni, sinon en une seule requête d'agrégation.
+        None si l'examen n'a aucun point (non notable), comme dans
+        scoring.to_percentage.
+        """
+        from .scoring import grade, score_points, to_percentage
         
-        earned_points = 0
-        for answer in self.answers.all():
-            if answer.choice.is_correct:
-                earned_points += answer.question.points
+        if content is not None:
+            answers = self.answers.values_list('question_id', 'choice_id')
+            earned_points, total_points = grade(content, answers)
+        else:
+            earned_points, total_points = score_points([self.pk]).get(self.pk, (0, 0))
         
-        self.score = (earned_points / total_points) * 100
+        self.score = to_percentage(earned_points, total_points)
         return self.score
     
-    def finish(self):
-        """Termine la session d'examen"""
+    def record_answers(self, choices_by_question, content=None):
+        """
+        Enregistre les réponses {question_id: choice_id} de la session.
+        Les choix sont validés (contre le contenu en cache de l'examen s'il
+        est fourni, sinon en une requête) puis toutes les réponses sont
+        écrites en un seul upsert (contrainte session/question).
+        """
+        if not choices_by_question:
+            return []
+        
+        # 1. Valider tous les choix
+        if content is not None:
+            choice_question = content['choice_question']
+            valid_pairs = {
+                (choice_question.get(choice_id), choice_id)
+                for choice_id in choices_by_question.values()
+            }
+        else:
+            valid_pairs = set(
+                Choice.objects.filter(
+                    id__in=choices_by_question.values(),
+                    question__exam_id=self.exam_id,
+                ).values_list('question_id', 'id')
+            )
+        for question_id, choice_id in choices_by_question.items():
+            if (question_id, choice_id) not in valid_pairs:
+                raise Choice.DoesNotExist(
+                    f"Choix {choice_id} invalide pour la question {question_id}"
+                )
+        
+        # 2. Écrire toutes les réponses en un seul INSERT ... ON CONFLICT/DUPLICATE KEY
+        answers = [
+            Answer(session=self, question_id=question_id, choice_id=choice_id)
+            for question_id, choice_id in choices_by_question.items()
+        ]
+        # MySQL ne permet pas de préciser la contrainte ciblée par l'upsert
+        unique_fields = None
+        if connection.features.supports_update_conflicts_with_target:
+            unique_fields = ['session', 'question']
+        return Answer.objects.bulk_create(
+            answers,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=['choice'],
+        )
+    
+    def submit(self):
+        """
+        Termine la session sans la noter : elle passe au statut « grading »
+        et sera notée en arrière-plan (voir exams/grading.py).
+        """
         self.finished_at = timezone.now()
-        self.status = 'completed'
-        self.calculate_score()
-        self.save()
+        self.status = 'grading'
+        self.save(update_fields=['finished_at', 'status'])
+    
+    def finish(self, content=None):
+        """
+        Termine la session d'examen. La transition vers « completed » est
+        réclamée par un UPDATE conditionnel (comme dans exams/grading.py) :
+        un double envoi ou une correction relancée ne compte la session
+        qu'une fois. Retourne True si cet appel a terminé la session.
+        """
+        from . import counters
+        from .stats import record_finished_session
+        from .versions import bump_exam_results_version, bump_user_sessions_version
+        
+        # Une session soumise (correction différée) garde sa date de soumission
+        finished_at = self.finished_at if self.status == 'grading' and self.finished_at else timezone.now()
+        self.calculate_score(content)
+        with transaction.atomic():
+            claimed = ExamSession.objects.filter(
+                pk=self.pk, status__in=('in_progress', 'grading')
+            ).update(finished_at=finished_at, status='completed', score=self.score)
+            if not claimed:
+                # Déjà terminée : état réel de la session, aucun effet de bord
+                self.refresh_from_db(fields=['finished_at', 'status', 'score'])
+                return False
+            self.finished_at = finished_at
+            self.status = 'completed'
+            record_finished_session(self)
+            counters.increment(counters.COMPLETED_SESSIONS)
+            exam_id, user_id = self.exam_id, self.user_id
+            transaction.on_commit(lambda: bump_exam_results_version(exam_id))
+            # UPDATE sans signal : fragments de l'utilisateur (exams/signals.py)
+            transaction.on_commit(lambda: bump_user_sessions_version(user_id))
+        return True
 
 
 class Answer(models.Model):
@@ -211,14 +320,81 @@ class RequestLog(models.Model):
     status_code = models.IntegerField(verbose_name="Code de statut")
     ip_address = models.GenericIPAddressField(verbose_name="Adresse IP")
     user_agent = models.TextField(blank=True, verbose_name="User Agent")
-    timestamp = models.DateTimeField(auto_now_add=True, verbose_name="Horodatage")
+    timestamp = models.DateTimeField(default=timezone.now, verbose_name="Horodatage")
     response_time = models.FloatField(null=True, blank=True, verbose_name="Temps de réponse (s)")
     
     class Meta:
         verbose_name = "Log de requête"
         verbose_name_plural = "Logs de requêtes"
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['user', '-timestamp'], name='requestlog_user_timestamp'),
+        ]
     
     def __str__(self):
         user_str = self.user.username if self.user else "Anonyme"
-        return f"[{self.status_code}] {self.method} {self.path} - {user_str}"
\ No newline at end of file
+        return f"[{self.status_code}] {self.method} {self.path} - {user_str}"
+
+
+class UserExamStats(models.Model):
+    """Statistiques matérialisées d'un utilisateur (mises à jour par ExamSession.finish)"""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='exam_stats',
+        verbose_name="Utilisateur"
+    )
+    exams_taken = models.IntegerField(default=0, verbose_name="Examens passés")
+    exams_passed = models.IntegerField(default=0, verbose_name="Examens réussis")
+    score_sum = models.FloatField(default=0, verbose_name="Somme des scores")
+    best_score = models.FloatField(null=True, blank=True, verbose_name="Meilleur score (%)")
+    last_score = models.FloatField(null=True, blank=True, verbose_name="Dernier score (%)")
+    last_finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Dernier examen terminé le")
+    
+    class Meta:
+        verbose_name = "Statistiques utilisateur"
+        verbose_name_plural = "Statistiques utilisateurs"
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.exams_passed}/{self.exams_taken}"
+    
+    @property
+    def average_score(self):
+        """Retourne le score moyen des examens terminés"""
+        if not self.exams_taken:
+            return 0
+        return self.score_sum / self.exams_taken
+
+
+class GlobalCounter(models.Model):
+    """Compteur global maintenu incrémentalement (voir exams/counters.py)"""
+    name = models.CharField(max_length=50, primary_key=True, verbose_name="Nom")
+    value = models.BigIntegerField(default=0, verbose_name="Valeur")
+    
+    class Meta:
+        verbose_name = "Compteur global"
+        verbose_name_plural = "Compteurs globaux"
+    
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class UserActivity(models.Model):
+    """Dernière activité connue d'un utilisateur (écrite par lots, voir SessionSecurityMiddleware)"""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='activity',
+        verbose_name="Utilisateur"
+    )
+    last_activity = models.DateTimeField(verbose_name="Dernière activité")
+    ip_address = models.GenericIPAddressField(null=True, blank=True, verbose_name="Adresse IP")
+    
+    class Meta:
+        verbose_name = "Activité utilisateur"
+        verbose_name_plural = "Activités utilisateurs"
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.last_activity:%d/%m/%Y %H:%M}"
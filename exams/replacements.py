@@ -4,64 +4,111 @@ Code qui REMPLACE les middlewares Django quand ils sont désactivés
 Ce fichier montre ce que Django fait automatiquement en interne
 """
 
+import copy
 import hashlib
+import logging
+from importlib import import_module
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import HASH_SESSION_KEY
 from django.contrib.auth.models import User
-from django.contrib.sessions.backends.db import SessionStore
-from django.contrib.sessions.models import Session
+from django.contrib.sessions.backends.base import UpdateError
+from django.contrib.sessions.exceptions import SessionInterrupted
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.http import HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from projet9 import metrics
+from projet9.middleware import AsyncMiddlewareMixin
+from .lru import LRUCache
+
+logger = logging.getLogger('exams.replacements')
+
+SESSION_COOKIE_NAME = 'sessionid'
+SESSION_COOKIE_MAX_AGE = 3600
 
 
 # ========================================
 # REMPLACE SessionMiddleware
 # ========================================
-class ManualSessionMiddleware(MiddlewareMixin):
+class ManualSessionMiddleware(AsyncMiddlewareMixin):
     """
     Ce que Django fait automatiquement avec SessionMiddleware :
     - Charger la session depuis la base de données
     - Créer request.session
     - Sauvegarder automatiquement les modifications
+    
+    La session est paresseuse : SessionStore ne lit la base (une seule
+    requête) qu'au premier accès à request.session. Elle n'est sauvegardée
+    que si elle a été modifiée, et le cookie n'est renvoyé que lorsque sa
+    valeur ou son expiration change.
+    
+    Le moteur de stockage est choisi par MANUAL_SESSION_ENGINE (base de
+    données par défaut, ou 'exams.session_store' pour le cache à niveaux).
+    En ASGI, seule la sauvegarde d'une session modifiée passe par un thread.
     """
     
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        engine = import_module(
+            getattr(settings, 'MANUAL_SESSION_ENGINE', 'django.contrib.sessions.backends.db')
+        )
+        self.SessionStore = engine.SessionStore
+    
     def process_request(self, request):
         """AVANT que la vue soit appelée"""
-        print("🔵 [MANUEL] SessionMiddleware activé")
-        
         # 1. Lire le cookie 'sessionid'
-        session_key = request.COOKIES.get('sessionid')
+        session_key = request.COOKIES.get(SESSION_COOKIE_NAME)
         
-        # 2. Charger la session depuis la DB ou créer une nouvelle
-        if session_key:
-            try:
-                Session.objects.get(session_key=session_key)
-                request.session = SessionStore(session_key)
-                print(f"   ✅ Session chargée : {session_key[:16]}...")
-            except Session.DoesNotExist:
-                request.session = SessionStore()
-                print(f"   🆕 Session invalide, nouvelle créée")
-        else:
-            request.session = SessionStore()
-            print(f"   🆕 Nouvelle session créée")
+        # 2. Session paresseuse : aucune requête tant qu'on n'y accède pas
+        #    (une clé invalide est remplacée par une nouvelle au chargement)
+        request.session = self.SessionStore(session_key)
+        logger.debug(f"🔵 [MANUEL] Session {'référencée' if session_key else 'nouvelle'}")
+    
+    async def aprocess_response(self, request, response):
+        session = getattr(request, 'session', None)
+        if session is not None and session.modified and not session.is_empty():
+            return await sync_to_async(self.process_response)(request, response)
+        return self.process_response(request, response)
     
     def process_response(self, request, response):
         """APRÈS que la vue a été exécutée"""
         
-        if hasattr(request, 'session'):
-            # 3. Sauvegarder la session en DB
-            if request.session.modified or request.session.is_empty():
-                request.session.save()
-                print(f"   💾 Session sauvegardée en DB")
+        if not hasattr(request, 'session'):
+            return response
+        
+        session = request.session
+        cookie_key = request.COOKIES.get(SESSION_COOKIE_NAME)
+        
+        # 3. Session vide (déconnexion, clé invalide) : supprimer le cookie
+        if cookie_key and session.is_empty():
+            response.delete_cookie(SESSION_COOKIE_NAME, samesite='Lax')
+            logger.debug("   🗑️ Cookie 'sessionid' supprimé")
+            return response
+        
+        # 4. Sauvegarder uniquement si la vue a modifié la session
+        if session.modified and not session.is_empty():
+            try:
+                session.save()
+            except UpdateError:
+                raise SessionInterrupted(
+                    "La session a été supprimée avant la fin de la requête."
+                )
+            logger.debug("   💾 Session sauvegardée en DB")
             
-            # 4. Ajouter le cookie à la réponse
+            # 5. Le cookie change (nouvelle clé ou expiration repoussée)
             response.set_cookie(
-                key='sessionid',
-                value=request.session.session_key,
-                max_age=3600,
+                key=SESSION_COOKIE_NAME,
+                value=session.session_key,
+                max_age=SESSION_COOKIE_MAX_AGE,
                 httponly=True,
                 secure=False,
                 samesite='Lax'
             )
-            print(f"   🍪 Cookie 'sessionid' envoyé au client")
+            logger.debug("   🍪 Cookie 'sessionid' envoyé au client")
         
         return response
 
@@ -69,41 +116,97 @@ class ManualSessionMiddleware(MiddlewareMixin):
 # ========================================
 # REMPLACE AuthenticationMiddleware
 # ========================================
-class ManualAuthMiddleware(MiddlewareMixin):
+_user_cache = LRUCache(
+    maxsize=getattr(settings, 'AUTH_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 30),
+)
+USER_CACHE_HITS = metrics.registry.counter(
+    'projet9_auth_user_cache_hits_total', 'Utilisateurs servis par le cache de ManualAuthMiddleware'
+)
+USER_CACHE_MISSES = metrics.registry.counter(
+    'projet9_auth_user_cache_misses_total', 'Utilisateurs chargés en base par ManualAuthMiddleware'
+)
+
+
+def get_cached_user(request):
+    """
+    Retourne l'utilisateur de la session, depuis un cache par processus
+    (clé : id de l'utilisateur, TTL court). Le hash de mot de passe de la
+    session est comparé à chaque appel, y compris sur un succès du cache.
+    """
+    # 1. Récupérer l'ID de l'utilisateur depuis la session
+    user_id = request.session.get('_auth_user_id')
+    if not user_id:
+        logger.debug("   🔓 Aucun utilisateur connecté")
+        return AnonymousUserManual()
+    
+    # 2. Cache, sinon chargement depuis la base de données
+    key = str(user_id)
+    user = _user_cache.get(key)
+    if user is not None:
+        USER_CACHE_HITS.inc()
+    else:
+        USER_CACHE_MISSES.inc()
+        try:
+            user = User.objects.get(pk=user_id)
+        except User.DoesNotExist:
+            logger.debug(f"   ⚠️  Utilisateur ID {user_id} introuvable")
+            # Nettoyer la session
+            del request.session['_auth_user_id']
+            return AnonymousUserManual()
+        _user_cache.set(key, user)
+        logger.debug(f"   👤 Utilisateur chargé : {user.username} (ID: {user.id})")
+    
+    # 3. Mot de passe changé depuis la connexion : session invalide
+    session_hash = request.session.get(HASH_SESSION_KEY, '')
+    if session_hash and not constant_time_compare(session_hash, user.get_session_auth_hash()):
+        logger.debug(f"   ⚠️  Session obsolète pour l'utilisateur ID {user_id}")
+        request.session.flush()
+        return AnonymousUserManual()
+    
+    # Une copie pour que la requête ne modifie pas l'entrée partagée
+    return copy.copy(user)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    """
+    Utilisateur modifié ou supprimé : ce processus ne sert plus l'ancienne
+    version (les autres workers la gardent au plus AUTH_USER_CACHE_TTL s)
+    """
+    _user_cache.delete(str(instance.pk))
+
+
+async def aget_cached_user(request):
+    """Version asynchrone de get_cached_user (request.auser)"""
+    return await sync_to_async(get_cached_user)(request)
+
+
+class ManualAuthMiddleware(AsyncMiddlewareMixin):
     """
     Ce que Django fait automatiquement avec AuthenticationMiddleware :
     - Lire '_auth_user_id' dans la session
     - Charger l'utilisateur depuis User.objects
     - Créer request.user
+    
+    request.user est paresseux : l'utilisateur n'est résolu (via le cache de
+    get_cached_user) que si la vue ou un middleware l'utilise. En pratique
+    LoggingMiddleware et SessionSecurityMiddleware le lisent à chaque
+    requête : c'est le cache qui évite la requête SQL, pas la paresse.
     """
     
     def process_request(self, request):
         """AVANT que la vue soit appelée"""
-        print("🟢 [MANUEL] AuthenticationMiddleware activé")
-        
         # 1. Vérifier qu'une session existe
         if not hasattr(request, 'session'):
             request.user = AnonymousUserManual()
-            print("   ❌ Pas de session, utilisateur anonyme")
+            logger.debug("   ❌ Pas de session, utilisateur anonyme")
             return
         
-        # 2. Récupérer l'ID de l'utilisateur depuis la session
-        user_id = request.session.get('_auth_user_id')
-        
-        # 3. Charger l'utilisateur depuis la base de données
-        if user_id:
-            try:
-                user = User.objects.get(pk=user_id)
-                request.user = user
-                print(f"   👤 Utilisateur chargé : {user.username} (ID: {user.id})")
-            except User.DoesNotExist:
-                request.user = AnonymousUserManual()
-                print(f"   ⚠️  Utilisateur ID {user_id} introuvable")
-                # Nettoyer la session
-                del request.session['_auth_user_id']
-        else:
-            request.user = AnonymousUserManual()
-            print(f"   🔓 Aucun utilisateur connecté")
+        # 2. Résolution différée de l'utilisateur (request.auser en ASGI)
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
+        request.auser = lambda: aget_cached_user(request)
 
 
 class AnonymousUserManual:
@@ -0,0 +1,103 @@
+"""
+Moteur de notation ensembliste.
+
+Les points obtenus et le total de l'examen sont calculés par la base de
+données en une seule requête d'agrégation, pour une session ou pour un lot
+de sessions entier. Le total provient de l'agrégat stocké Exam.num_points.
+grade() note une session à partir du contenu en cache, sans requête.
+"""
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import ExamSession
+from .versions import bump_all_user_sessions_versions, bump_exam_results_version
+
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def score_points(sessions):
+    """
+    Retourne {session_id: (points_obtenus, points_totaux)} pour un queryset
+    (ou une liste d'identifiants) de sessions, en une seule requête.
+    """
+    if not hasattr(sessions, 'annotate'):
+        sessions = ExamSession.objects.filter(pk__in=list(sessions))
+
+    rows = sessions.order_by().annotate(
+        earned=Coalesce(
+            Sum('answers__question__points', filter=Q(answers__choice__is_correct=True)),
+            0,
+        ),
+        total=F('exam__num_points'),
+    ).values_list('pk', 'earned', 'total')
+
+    return {pk: (earned, total) for pk, earned, total in rows}
+
+
+def grade(content, answers):
+    """
+    Note des réponses (question_id, choice_id) avec le corrigé du contenu en
+    cache (exams/content_cache.py), sans requête. Retourne (obtenus, totaux).
+    """
+    correct_choices = content['correct_choices']
+    points = content['points']
+    earned = sum(
+        points.get(question_id, 0)
+        for question_id, choice_id in answers
+        if choice_id in correct_choices
+    )
+    return earned, content['total_points']
+
+
+def to_percentage(earned, total):
+    """Convertit des points en score (%) ; None si l'examen n'a aucun point (non notable)"""
+    if not total:
+        return None
+    return (earned / total) * 100
+
+
+def score_sessions(sessions):
+    """Retourne {session_id: score (%)} pour un lot de sessions"""
+    return {
+        pk: to_percentage(earned, total)
+        for pk, (earned, total) in score_points(sessions).items()
+    }
+
+
+def rescore_sessions(sessions=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Recalcule et enregistre le score de sessions terminées par lots.
+    Chaque lot coûte une requête d'agrégation et un bulk_update.
+    Retourne le nombre de sessions recalculées.
+    """
+    if sessions is None:
+        sessions = ExamSession.objects.filter(status='completed')
+
+    rows = sessions.order_by('pk').values_list('pk', 'exam_id')
+    rescored = 0
+    batch = []
+    exam_ids = set()
+    for session_id, exam_id in rows.iterator(chunk_size=batch_size):
+        batch.append(session_id)
+        exam_ids.add(exam_id)
+        if len(batch) >= batch_size:
+            rescored += _rescore_batch(batch)
+            batch = []
+    if batch:
+        rescored += _rescore_batch(batch)
+    # bulk_update sans signal : statistiques des examens (analytics, analyse
+    # des questions) et fragments de tous les utilisateurs
+    if rescored:
+        transaction.on_commit(lambda: [bump_exam_results_version(exam_id) for exam_id in exam_ids])
+        transaction.on_commit(bump_all_user_sessions_versions)
+    return rescored
+
+
+def _rescore_batch(session_ids):
+    """Recalcule un lot de sessions identifiées par leur clé primaire"""
+    scores = score_sessions(session_ids)
+    updated = [ExamSession(pk=pk, score=score) for pk, score in scores.items()]
+    ExamSession.objects.bulk_update(updated, ['score'])
+    return len(updated)
@@ -0,0 +1,148 @@
+"""
+Moteur de session à plusieurs niveaux pour ManualSessionMiddleware.
+
+Lecture : LRU en mémoire du processus (TTL court) → cache Django → base.
+Écriture (SESSION_WRITE_MODE) :
+- 'write_through' : base puis caches, de manière synchrone (comme cached_db)
+- 'write_behind' : caches immédiatement, base en différé par lots ; seule
+  la création d'une session reste synchrone (unicité de la clé). File
+  pleine : la session est écrite tout de suite, jamais perdue.
+
+Une session supprimée (déconnexion) laisse une marque dans le cache partagé
+pendant DELETED_TTL secondes : une écriture différée encore en file, dans ce
+worker ou un autre, ne la recrée pas.
+
+Le cache Django doit être partagé entre les workers (Redis, voir CACHES et
+exams/checks.py), sinon une déconnexion faite par un worker resterait
+invisible pour les autres. Le niveau local n'est pas partagé non plus :
+SESSION_LOCAL_CACHE_TTL = 0 le désactive (cas de plusieurs workers).
+
+Activation : MANUAL_SESSION_ENGINE = 'exams.session_store'
+"""
+import copy
+
+from django.conf import settings
+from django.core.cache import caches
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.db import connection
+
+from projet9.batching import CALLER_RUNS, BatchWriter
+from .lru import LRUCache
+
+WRITE_THROUGH = 'write_through'
+WRITE_BEHIND = 'write_behind'
+
+_local = LRUCache(
+    maxsize=getattr(settings, 'SESSION_LOCAL_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'SESSION_LOCAL_CACHE_TTL', 5),
+)
+# Marque « session supprimée » dans le cache partagé (voir _write_sessions)
+DELETED_PREFIX = 'exams.session_store.deleted:'
+DELETED_TTL = 300
+
+
+def _write_sessions(batch):
+    """Écrit un lot de sessions en un seul upsert (dernière version par clé)"""
+    from django.contrib.sessions.models import Session
+
+    latest = {}
+    for session_key, session_data, expire_date in batch:
+        latest[session_key] = (session_data, expire_date)
+    # Sessions supprimées entre-temps, par n'importe quel worker
+    deleted = caches[settings.SESSION_CACHE_ALIAS].get_many(
+        [DELETED_PREFIX + key for key in latest]
+    )
+    sessions = [
+        Session(session_key=key, session_data=data, expire_date=expire_date)
+        for key, (data, expire_date) in latest.items()
+        if DELETED_PREFIX + key not in deleted
+    ]
+    unique_fields = None
+    if connection.features.supports_update_conflicts_with_target:
+        unique_fields = ['session_key']
+    Session.objects.bulk_create(
+        sessions,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=['session_data', 'expire_date'],
+    )
+
+
+db_writer = BatchWriter(
+    'session-write-behind',
+    _write_sessions,
+    batch_size=getattr(settings, 'SESSION_WRITE_BEHIND_BATCH_SIZE', 200),
+    flush_interval=getattr(settings, 'SESSION_WRITE_BEHIND_INTERVAL', 1.0),
+    overflow=CALLER_RUNS,
+)
+
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = 'exams.session_store'
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self.write_mode = getattr(settings, 'SESSION_WRITE_MODE', WRITE_THROUGH)
+
+    def _local_key(self):
+        return self.cache_key_prefix + self._session_key
+
+    def _remember(self, data):
+        if not _local.ttl:
+            return  # Niveau local désactivé
+        # Expiration lue dans `data` : self.get() rechargerait la session
+        expiry_age = self.get_expiry_age(expiry=data.get('_session_expiry'))
+        ttl = min(_local.ttl or expiry_age, expiry_age)
+        _local.set(self._local_key(), copy.deepcopy(data), ttl=ttl)
+
+    def load(self):
+        if self._session_key:
+            data = _local.get(self._local_key())
+            if data is not None:
+                return copy.deepcopy(data)
+
+        data = super().load()
+        if self._session_key and data:
+            self._remember(data)
+        return data
+
+    async def aload(self):
+        if self._session_key:
+            data = _local.get(self._local_key())
+            if data is not None:
+                return copy.deepcopy(data)
+
+        data = await super().aload()
+        if self._session_key and data:
+            self._remember(data)
+        return data
+
+    def exists(self, session_key):
+        if _local.get(self.cache_key_prefix + session_key) is not None:
+            return True
+        return super().exists(session_key)
+
+    def save(self, must_create=False):
+        if self.write_mode != WRITE_BEHIND or must_create or self.session_key is None:
+            super().save(must_create)
+        else:
+            data = self._get_session()
+            self._cache.set(self.cache_key, data, self.get_expiry_age())
+            db_writer.submit((self.session_key, self.encode(data), self.get_expiry_date()))
+        self._remember(self._get_session())
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            session_key = self.session_key
+        if session_key is not None:
+            _local.delete(self.cache_key_prefix + session_key)
+            self._cache.set(DELETED_PREFIX + session_key, 1, DELETED_TTL)
+        super().delete(session_key)
+
+    async def adelete(self, session_key=None):
+        if session_key is None:
+            session_key = self.session_key
+        if session_key is not None:
+            _local.delete(self.cache_key_prefix + session_key)
+            await self._cache.aset(DELETED_PREFIX + session_key, 1, DELETED_TTL)
+        await super().adelete(session_key)
@@ -0,0 +1,131 @@
+"""
+Signaux qui maintiennent les agrégats dénormalisés de Exam, les
+compteurs globaux de la page d'accueil et les versions des fragments de
+templates en cache (exams/versions.py)
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import aggregates, counters, versions
+from .models import Choice, Exam, ExamSession, Question
+
+
+@receiver(pre_save, sender=Question)
+@receiver(pre_save, sender=Choice)
+def remember_parent(sender, instance, raw=False, **kwargs):
+    # Parent avant modification : une question (un choix) peut changer
+    # d'examen (de question), les agrégats de l'ancien sont alors à refaire
+    if raw or instance._state.adding:
+        return
+    field = 'exam_id' if sender is Question else 'question_id'
+    instance._previous_parent_id = (
+        sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+    )
+
+
+def _previous_parent(instance, current):
+    previous = getattr(instance, '_previous_parent_id', None)
+    return previous if previous not in (None, current) else None
+
+
+@receiver(post_save, sender=Question)
+def question_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        aggregates.question_added(instance.exam_id, instance.points)
+    else:
+        # Les points ont pu changer : recalcul ciblé de l'examen, et de
+        # l'examen d'origine si la question a été déplacée
+        exam_ids = [instance.exam_id]
+        previous = _previous_parent(instance, instance.exam_id)
+        if previous is not None:
+            exam_ids.append(previous)
+        aggregates.refresh_exam_aggregates(exam_ids)
+
+
+@receiver(post_delete, sender=Question)
+def question_deleted(sender, instance, **kwargs):
+    aggregates.question_removed(instance.exam_id, instance.points)
+
+
+@receiver(post_save, sender=Choice)
+def choice_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    aggregates.answer_key_changed(instance.question_id)
+    previous = _previous_parent(instance, instance.question_id)
+    if previous is not None:
+        aggregates.answer_key_changed(previous)
+
+
+@receiver(post_delete, sender=Choice)
+def choice_deleted(sender, instance, **kwargs):
+    aggregates.answer_key_changed(instance.question_id)
+
+
+@receiver(post_save, sender=Exam)
+@receiver(post_delete, sender=Exam)
+def exam_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    counters.refresh_active_exams()
+
+
+@receiver(post_save, sender=ExamSession)
+def exam_session_saved(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    # Première session de cet utilisateur : un étudiant de plus
+    if not ExamSession.objects.filter(user_id=instance.user_id).exclude(pk=instance.pk).exists():
+        counters.increment(counters.DISTINCT_STUDENTS)
+
+
+@receiver(post_save, sender=Exam)
+@receiver(post_delete, sender=Exam)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def exam_content_changed(sender, instance, raw=False, **kwargs):
+    # Fragments de la liste des examens ; ceux d'un examen sont versionnés
+    # par Exam.updated_at (mis à jour par exams/aggregates.py)
+    if raw:
+        return
+    transaction.on_commit(versions.bump_exam_catalog_version)
+
+
+@receiver(post_save, sender=ExamSession)
+@receiver(post_delete, sender=ExamSession)
+def exam_session_changed(sender, instance, raw=False, **kwargs):
+    # Fragments propres à l'utilisateur (session commencée, soumise, terminée)
+    if raw:
+        return
+    user_id = instance.user_id
+    transaction.on_commit(lambda: versions.bump_user_sessions_version(user_id))
+
+
+@receiver(post_delete, sender=ExamSession)
+def exam_session_deleted(sender, instance, origin=None, **kwargs):
+    if instance.status == 'completed':
+        counters.increment(counters.COMPLETED_SESSIONS, -1)
+    # Dans une suppression groupée (cascade depuis User, queryset.delete()),
+    # toutes les sessions sont supprimées avant l'envoi des post_delete :
+    # un seul décrément par utilisateur et par suppression (`origin`)
+    checked = _checked_users(origin)
+    if instance.user_id in checked:
+        return
+    checked.add(instance.user_id)
+    if not ExamSession.objects.filter(user_id=instance.user_id).exists():
+        counters.increment(counters.DISTINCT_STUDENTS, -1)
+
+
+def _checked_users(origin):
+    """Utilisateurs déjà vérifiés pour la suppression en cours"""
+    if origin is None:
+        return set()
+    checked = getattr(origin, '_distinct_students_checked', None)
+    if checked is None:
+        checked = origin._distinct_students_checked = set()
+    return checked
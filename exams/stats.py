@@ -0,0 +1,94 @@
+"""
+Statistiques matérialisées par utilisateur (UserExamStats).
+
+record_finished_session() applique une mise à jour incrémentale à la fin
+de chaque session ; rebuild_user_stats() recalcule tout depuis ExamSession.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import ExamSession, UserExamStats
+
+
+def record_finished_session(session):
+    """Ajoute une session terminée aux statistiques de son utilisateur"""
+    score = session.score
+    passed = 1 if session.is_passed else 0
+    changes = {
+        'exams_taken': F('exams_taken') + 1,
+        'exams_passed': F('exams_passed') + passed,
+        'last_score': score,
+        'last_finished_at': session.finished_at,
+    }
+    # Session non notable (score None) : ignorée par la somme et le
+    # meilleur score, comme Sum/Max dans rebuild_user_stats()
+    if score is not None:
+        changes['score_sum'] = F('score_sum') + score
+        changes['best_score'] = Greatest(Coalesce(F('best_score'), Value(score)), Value(score))
+
+    # Cas courant : une seule requête UPDATE
+    if UserExamStats.objects.filter(pk=session.user_id).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            UserExamStats.objects.create(
+                user_id=session.user_id,
+                exams_taken=1,
+                exams_passed=passed,
+                score_sum=score or 0,
+                best_score=score,
+                last_score=score,
+                last_finished_at=session.finished_at,
+            )
+    except IntegrityError:
+        # Créé entre-temps par une autre requête
+        UserExamStats.objects.filter(pk=session.user_id).update(**changes)
+
+
+def rebuild_user_stats(user_ids=None, batch_size=1000):
+    """
+    Recalcule les statistiques (de tous les utilisateurs ou de `user_ids`)
+    à partir des sessions terminées. Retourne le nombre de lignes écrites.
+    """
+    completed = ExamSession.objects.filter(status='completed')
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        completed = completed.filter(user_id__in=user_ids)
+
+    last_session = ExamSession.objects.filter(
+        user=OuterRef('user'), status='completed'
+    ).order_by('-finished_at', '-pk')
+
+    rows = (
+        completed.order_by()
+        .values('user')
+        .annotate(
+            taken=Count('pk'),
+            passed=Count('pk', filter=Q(score__gte=F('exam__passing_score'))),
+            total=Coalesce(Sum('score'), 0.0),
+            best=Max('score'),
+            last=Subquery(last_session.values('score')[:1]),
+            last_at=Max('finished_at'),
+        )
+    )
+    stats = [
+        UserExamStats(
+            user_id=row['user'],
+            exams_taken=row['taken'],
+            exams_passed=row['passed'],
+            score_sum=row['total'],
+            best_score=row['best'],
+            last_score=row['last'],
+            last_finished_at=row['last_at'],
+        )
+        for row in rows
+    ]
+
+    with transaction.atomic():
+        existing = UserExamStats.objects.all()
+        if user_ids is not None:
+            existing = existing.filter(user_id__in=user_ids)
+        existing.delete()
+        UserExamStats.objects.bulk_create(stats, batch_size=batch_size)
+    return len(stats)
@@ -1,3 +1,844 @@
-from django.test import TestCase
+import io
+import json
+import os
+import queue
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connection, models
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.conf import settings
+from django.urls import path, resolve, reverse
+from django.utils import timezone
+
+from projet9 import metrics
+from projet9.batching import CALLER_RUNS, DROP_OLDEST, BatchWriter
+from projet9.middleware import LoggingMiddleware, get_client_ip, request_log_writer
+
+from . import async_views, content_cache, counters, grading, session_store, urls, versions
+from .models import Choice, Exam, ExamSession, GlobalCounter, Question, UserExamStats
+
+
+def counter_value(name):
+    return GlobalCounter.objects.filter(name=name).values_list('value', flat=True).first() or 0
+
+
+def create_exam(title='Examen', questions=2, points=1):
+    """Examen de `questions` questions à deux choix (le premier est le bon)"""
+    exam = Exam.objects.create(title=title, description='', duration=30)
+    for order in range(questions):
+        question = Question.objects.create(exam=exam, text=f'Question {order}', points=points, order=order)
+        Choice.objects.create(question=question, text='Bonne', is_correct=True)
+        Choice.objects.create(question=question, text='Mauvaise')
+    exam.refresh_from_db()
+    return exam
+
+
+def answer_key(exam, correct=True):
+    """{question_id: choice_id} : toutes les bonnes (ou mauvaises) réponses"""
+    return dict(
+        Choice.objects.filter(question__exam=exam, is_correct=correct).values_list('question_id', 'id')
+    )
+
+
+class DistinctStudentsCounterTests(TestCase):
+    """Compteur des étudiants distincts (exams/signals.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.exams = [Exam.objects.create(title=f'Examen {index}', duration=30) for index in range(3)]
+
+    def setUp(self):
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        for exam in self.exams:
+            ExamSession.objects.create(user=self.alice, exam=exam)
+        ExamSession.objects.create(user=self.bob, exam=self.exams[0])
+
+    def test_first_session_counts_the_student_once(self):
+        self.assertEqual(counter_value(counters.DISTINCT_STUDENTS), 2)
+
+    def test_user_cascade_decrements_once(self):
+        self.alice.delete()
+        self.assertEqual(counter_value(counters.DISTINCT_STUDENTS), 1)
+
+    def test_queryset_delete_decrements_once_per_user(self):
+        ExamSession.objects.filter(user=self.alice).delete()
+        self.assertEqual(counter_value(counters.DISTINCT_STUDENTS), 1)
+
+    def test_deleting_one_of_several_sessions_keeps_the_student(self):
+        ExamSession.objects.filter(user=self.alice, exam=self.exams[0]).delete()
+        self.assertEqual(counter_value(counters.DISTINCT_STUDENTS), 2)
+
+    def test_counter_matches_reconcile(self):
+        self.alice.delete()
+        expected = counter_value(counters.DISTINCT_STUDENTS)
+        self.assertEqual(counters.reconcile()[counters.DISTINCT_STUDENTS], expected)
+
+
+@override_settings(GRADING_MODE='deferred', GRADING_RETRY_AFTER=30, REQUEST_LOG_ENABLED=False)
+class DeferredGradingTests(TestCase):
+    """Correction différée : soumission → « grading » → notée (exams/grading.py)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.exam = create_exam()
+        self.client.force_login(self.user)
+        self.client.get(reverse('start_exam', args=[self.exam.pk]))
+        self.session = ExamSession.objects.get(user=self.user, exam=self.exam)
+        # Pas de thread de correction : les sessions mises en file sont notées ici
+        patcher = mock.patch.object(grading.grading_queue, 'submit')
+        self.submit = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def submit_exam(self):
+        form = {f'question_{question_id}': choice_id for question_id, choice_id in answer_key(self.exam).items()}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('take_exam', args=[self.exam.pk]), form)
+        self.session.refresh_from_db()
+
+    def test_submit_then_grade(self):
+        self.submit_exam()
+        self.assertEqual(self.session.status, 'grading')
+        self.assertIsNone(self.session.score)
+        self.submit.assert_called_once_with(self.session.pk)
+        result_url = reverse('exam_result', args=[self.session.pk])
+        self.assertTrue(self.client.get(result_url).context['grading'])
+
+        completed = counter_value(counters.COMPLETED_SESSIONS)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(grading.grade_sessions([self.session.pk]), 1)
+        self.session.refresh_from_db()
+        self.assertEqual((self.session.status, self.session.score), ('completed', 100))
+        self.assertEqual(counter_value(counters.COMPLETED_SESSIONS), completed + 1)
+        self.assertEqual(UserExamStats.objects.get(user=self.user).exams_passed, 1)
+        self.assertNotIn('grading', self.client.get(result_url).context)
+
+    def test_grading_twice_counts_once(self):
+        self.submit_exam()
+        completed = counter_value(counters.COMPLETED_SESSIONS)
+        self.assertEqual(grading.grade_sessions([self.session.pk]), 1)
+        self.assertEqual(grading.grade_sessions([self.session.pk]), 0)
+        self.assertEqual(grading.grade_pending(), 0)
+        self.assertEqual(counter_value(counters.COMPLETED_SESSIONS), completed + 1)
+        self.assertEqual(UserExamStats.objects.get(user=self.user).exams_taken, 1)
+
+    def test_session_claimed_by_another_worker(self):
+        self.submit_exam()
+        completed = counter_value(counters.COMPLETED_SESSIONS)
+        score_points = grading.score_points
+
+        def graded_elsewhere(session_ids):
+            # Un autre worker note la session pendant le calcul de ce lot
+            ExamSession.objects.filter(pk__in=session_ids).update(status='completed', score=100)
+            return score_points(session_ids)
+
+        with mock.patch.object(grading, 'score_points', graded_elsewhere):
+            self.assertEqual(grading.grade_sessions([self.session.pk]), 0)
+        self.assertEqual(counter_value(counters.COMPLETED_SESSIONS), completed)
+        self.assertFalse(UserExamStats.objects.filter(user=self.user, exams_taken__gt=0).exists())
+
+    def test_result_page_requeues_a_stale_session(self):
+        self.submit_exam()
+        self.submit.reset_mock()
+        result_url = reverse('exam_result', args=[self.session.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(result_url)
+        self.submit.assert_not_called()  # Encore dans la file
+
+        ExamSession.objects.filter(pk=self.session.pk).update(finished_at=timezone.now() - timedelta(minutes=5))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(result_url)
+        self.submit.assert_called_once_with(self.session.pk)
+
+    def test_grade_pending_picks_up_lost_sessions(self):
+        self.submit_exam()
+        self.assertEqual(grading.grade_pending(older_than=60), 0)
+        ExamSession.objects.filter(pk=self.session.pk).update(finished_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(grading.grade_pending(older_than=60), 1)
+
+
+@override_settings(REQUEST_LOG_ENABLED=False)
+class ExamContentCacheTests(TestCase):
+    """Cache du contenu des examens (exams/content_cache.py)"""
+
+    def setUp(self):
+        cache.clear()
+        content_cache.clear_local_cache()
+        self.user = User.objects.create_user('alice')
+        self.exam = create_exam()
+        self.question = self.exam.questions.first()
+        self.client.force_login(self.user)
+        self.client.get(reverse('start_exam', args=[self.exam.pk]))
+        self.take_url = reverse('take_exam', args=[self.exam.pk])
+
+    def content(self):
+        self.exam.refresh_from_db()
+        return content_cache.get_exam_content(self.exam)
+
+    def content_queries(self, url):
+        """Requêtes de la page qui lisent les questions ou les choix"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries if 'exams_question' in query['sql'] or 'exams_choice' in query['sql']]
+
+    def test_warm_cache_makes_no_query(self):
+        self.content()
+        content_cache.clear_local_cache()  # Niveau partagé seul
+        self.exam.refresh_from_db()
+        with self.assertNumQueries(0):
+            content_cache.get_exam_content(self.exam)
+
+    def test_question_and_choice_edits_invalidate(self):
+        self.content()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.question.text = 'Question reformulée'
+            self.question.save()
+        self.assertEqual(self.content()['questions'][0]['text'], 'Question reformulée')
+
+        wrong = self.question.choices.get(is_correct=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.question.choices.update(is_correct=False)  # Sans signal : ne compte pas
+            wrong.is_correct = True
+            wrong.save()
+        self.assertEqual(self.content()['answer_key'][self.question.pk], wrong.pk)
+
+    def test_take_exam_and_result_read_the_cache(self):
+        self.assertTrue(self.content_queries(self.take_url))  # Cache froid : chargé en base
+        self.assertEqual(self.content_queries(self.take_url), [])
+
+        form = {f'question_{question_id}': choice_id for question_id, choice_id in answer_key(self.exam).items()}
+        with override_settings(GRADING_MODE='inline'):
+            self.client.post(self.take_url, form)
+        session = ExamSession.objects.get(user=self.user, exam=self.exam)
+        result_url = reverse('exam_result', args=[session.pk])
+        self.client.get(result_url)
+        self.assertEqual(self.content_queries(result_url), [])
+
+    def test_page_reflects_edit_after_reload(self):
+        self.assertContains(self.client.get(self.take_url), self.question.text)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.question.text = 'Question reformulée'
+            self.question.save()
+        self.assertContains(self.client.get(self.take_url), 'Question reformulée')
+
+
+class RecordAnswersTests(TestCase):
+    """ExamSession.record_answers() : validation puis un seul upsert"""
+
+    def setUp(self):
+        self.exam = create_exam(questions=3)
+        self.session = ExamSession.objects.create(user=User.objects.create_user('alice'), exam=self.exam)
+
+    def answers(self):
+        return dict(self.session.answers.values_list('question_id', 'choice_id'))
+
+    def test_insert_then_update_with_one_upsert(self):
+        good, bad = answer_key(self.exam), answer_key(self.exam, correct=False)
+        self.session.record_answers(good)
+        changed = dict(list(bad.items())[:2])
+        # Validation des choix + INSERT ... ON CONFLICT
+        with self.assertNumQueries(2):
+            self.session.record_answers(changed)
+        self.assertEqual(self.answers(), {**good, **changed})
+        self.assertEqual(self.session.answers.count(), 3)
+
+    def test_invalid_choice_writes_nothing(self):
+        other = create_exam('Autre')
+        question_id = next(iter(answer_key(self.exam)))
+        choices = {question_id: next(iter(answer_key(other).values()))}
+        with self.assertRaises(Choice.DoesNotExist):
+            self.session.record_answers(choices)
+        self.assertEqual(self.answers(), {})
+
+
+class FinishSessionTests(TestCase):
+    """ExamSession.finish() : transition réclamée une seule fois"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.exam = create_exam()
+        self.session = ExamSession.objects.create(user=self.user, exam=self.exam)
+        self.session.record_answers(answer_key(self.exam))
+
+    def test_finish_scores_and_records_stats(self):
+        self.assertTrue(self.session.finish())
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, 'completed')
+        self.assertEqual(self.session.score, 100)
+        self.assertEqual(UserExamStats.objects.get(user=self.user).exams_taken, 1)
+        self.assertEqual(counter_value(counters.COMPLETED_SESSIONS), 1)
+
+    def test_finish_twice_counts_once(self):
+        self.assertTrue(self.session.finish())
+        self.assertFalse(self.session.finish())
+        # Instance périmée (double envoi du formulaire)
+        stale = ExamSession.objects.get(pk=self.session.pk)
+        stale.status = 'in_progress'
+        self.assertFalse(stale.finish())
+        self.assertEqual(stale.status, 'completed')
+        self.assertEqual(UserExamStats.objects.get(user=self.user).exams_taken, 1)
+        self.assertEqual(counter_value(counters.COMPLETED_SESSIONS), 1)
+
+    def test_finish_after_submit_keeps_submission_time(self):
+        self.session.submit()
+        submitted_at = self.session.finished_at
+        self.assertTrue(self.session.finish())
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.finished_at, submitted_at)
+        self.assertEqual(self.session.status, 'completed')
+
+
+# Pas de RequestLog : le writer en arrière-plan écrirait hors de la transaction du test
+@override_settings(REQUEST_LOG_ENABLED=False)
+class FragmentCacheInvalidationTests(TestCase):
+    """Versions des fragments en cache (exams/versions.py, exams/signals.py)"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', password='secret')
+        self.exam = create_exam('Algèbre')
+        self.client.force_login(self.user)
+
+    def test_content_change_bumps_catalog_version(self):
+        version = versions.exam_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Question.objects.filter(exam=self.exam).first().save()
+        self.assertNotEqual(versions.exam_catalog_version(), version)
+
+    def test_session_change_bumps_only_its_user(self):
+        other = User.objects.create_user('bob')
+        mine, theirs = versions.user_sessions_version(self.user.pk), versions.user_sessions_version(other.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            ExamSession.objects.create(user=self.user, exam=self.exam)
+        self.assertNotEqual(versions.user_sessions_version(self.user.pk), mine)
+        self.assertEqual(versions.user_sessions_version(other.pk), theirs)
+
+    def test_bump_all_invalidates_every_user(self):
+        version = versions.user_sessions_version(self.user.pk)
+        versions.bump_all_user_sessions_versions()
+        self.assertNotEqual(versions.user_sessions_version(self.user.pk), version)
+
+    def test_exam_list_reflects_exam_edit(self):
+        self.client.get(reverse('exam_list'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.exam.description = 'Nouvelle description'
+            self.exam.save()
+        self.assertContains(self.client.get(reverse('exam_list')), 'Nouvelle description')
+
+    def test_exam_list_reflects_finished_session(self):
+        self.assertNotContains(self.client.get(reverse('exam_list')), 'Voir les résultats')
+        session = ExamSession.objects.create(user=self.user, exam=self.exam)
+        with self.captureOnCommitCallbacks(execute=True):
+            session.finish()
+        self.assertContains(self.client.get(reverse('exam_list')), 'Voir les résultats')
+
+    def test_exam_detail_reflects_started_session(self):
+        url = reverse('exam_detail', args=[self.exam.pk])
+        self.assertContains(self.client.get(url), 'Commencer')
+        with self.captureOnCommitCallbacks(execute=True):
+            ExamSession.objects.create(user=self.user, exam=self.exam)
+        self.assertContains(self.client.get(url), 'Reprendre')
+
+
+@override_settings(REQUEST_LOG_ENABLED=False)
+class AutosaveTests(TestCase):
+    """Sauvegarde automatique d'une réponse (exams/views.autosave_answer)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret')
+        self.exam = create_exam()
+        self.client.force_login(self.user)
+        self.client.get(reverse('start_exam', args=[self.exam.pk]))
+        self.session = ExamSession.objects.get(user=self.user, exam=self.exam)
+        self.url = reverse('autosave_answer', args=[self.exam.pk])
+
+    def autosave(self, payload):
+        return self.client.post(self.url, json.dumps(payload), content_type='application/json')
+
+    def test_saves_and_replaces_the_answer(self):
+        (question_id, good), = list(answer_key(self.exam).items())[:1]
+        bad = answer_key(self.exam, correct=False)[question_id]
+        self.assertEqual(self.autosave({'question': question_id, 'choice': good}).status_code, 204)
+        self.assertEqual(self.autosave({'question': question_id, 'choice': bad}).status_code, 204)
+        answers = list(self.session.answers.values_list('question_id', 'choice_id'))
+        self.assertEqual(answers, [(question_id, bad)])
+
+    def test_invalid_payload_or_choice(self):
+        question_id, other_question = list(answer_key(self.exam))
+        self.assertEqual(self.autosave({'question': 'x'}).status_code, 400)
+        choice_id = answer_key(self.exam)[other_question]
+        self.assertEqual(self.autosave({'question': question_id, 'choice': choice_id}).status_code, 400)
+        self.assertFalse(self.session.answers.exists())
+
+    def test_session_not_in_progress(self):
+        self.session.finish()
+        question_id, choice_id = next(iter(answer_key(self.exam).items()))
+        self.assertEqual(self.autosave({'question': question_id, 'choice': choice_id}).status_code, 409)
+
+    @override_settings(GRADING_MODE='inline')
+    def test_submitted_form_wins_over_stale_autosave(self):
+        good, bad = answer_key(self.exam), answer_key(self.exam, correct=False)
+        # Dernière sauvegarde traitée par le serveur : la réponse abandonnée
+        for question_id, choice_id in bad.items():
+            self.autosave({'question': question_id, 'choice': choice_id})
+        form = {f'question_{question_id}': choice_id for question_id, choice_id in good.items()}
+        self.client.post(reverse('take_exam', args=[self.exam.pk]), form)
+        self.session.refresh_from_db()
+        self.assertEqual(dict(self.session.answers.values_list('question_id', 'choice_id')), good)
+        self.assertEqual(self.session.score, 100)
+
+    @override_settings(QUERY_PROFILER_SAMPLE_RATE=1.0, REQUEST_LOG_ENABLED=True)
+    def test_not_instrumented(self):
+        question_id, choice_id = next(iter(answer_key(self.exam).items()))
+        with mock.patch.object(request_log_writer, 'submit') as submit, \
+                mock.patch('projet9.profiling.record') as record:
+            self.autosave({'question': question_id, 'choice': choice_id})
+        submit.assert_not_called()
+        record.assert_not_called()
+        routes = {values[0] for values, _ in metrics.REQUESTS_TOTAL.series()}
+        self.assertNotIn('/exam/<int:exam_id>/autosave/', routes)
+
+
+class ManualAuthUserCacheTests(TestCase):
+    """Cache des utilisateurs de ManualAuthMiddleware (exams/replacements.py)"""
+
+    def setUp(self):
+        from .replacements import _user_cache
+
+        _user_cache.clear()
+        self.user = User.objects.create_user('alice', password='secret')
+
+    def request(self, user=None):
+        from django.contrib.auth import HASH_SESSION_KEY
+        from django.contrib.sessions.backends.db import SessionStore
+
+        request = RequestFactory().get('/')
+        request.session = SessionStore()
+        user = user or self.user
+        request.session['_auth_user_id'] = str(user.pk)
+        request.session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        return request
+
+    def get_user(self, request):
+        from .replacements import get_cached_user
+
+        return get_cached_user(request)
+
+    def test_cache_hit_avoids_the_user_query(self):
+        with self.assertNumQueries(1):
+            self.get_user(self.request())
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_user(self.request()).username, 'alice')
+
+    def test_expired_entry_is_refetched(self):
+        import time
+
+        self.get_user(self.request())
+        with mock.patch('exams.lru.time.monotonic', return_value=time.monotonic() + 3600), \
+                self.assertNumQueries(1):
+            self.get_user(self.request())
+
+    def test_logout_and_user_switch(self):
+        request = self.request()
+        self.get_user(request)
+        request.session.flush()
+        self.assertFalse(self.get_user(request).is_authenticated)
+        bob = User.objects.create_user('bob')
+        self.assertEqual(self.get_user(self.request(bob)).username, 'bob')
+
+    def test_password_change_invalidates_cached_session(self):
+        request = self.request()  # Session ouverte avec l'ancien mot de passe
+        self.get_user(request)
+        self.user.set_password('nouveau')
+        self.user.save()
+        self.assertFalse(self.get_user(request).is_authenticated)
+
+
+class ClientIpTests(SimpleTestCase):
+    """Adresse IP du client (projet9/middleware.py)"""
+
+    def request(self, forwarded=None, remote='10.0.0.1'):
+        headers = {'REMOTE_ADDR': remote}
+        if forwarded is not None:
+            headers['HTTP_X_FORWARDED_FOR'] = forwarded
+        return RequestFactory().get('/', **headers)
+
+    @override_settings(TRUSTED_PROXY_COUNT=0)
+    def test_forwarded_for_ignored_without_proxy(self):
+        self.assertEqual(get_client_ip(self.request('1.2.3.4')), '10.0.0.1')
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_entry_added_by_trusted_proxy(self):
+        self.assertEqual(get_client_ip(self.request('6.6.6.6, 1.2.3.4')), '1.2.3.4')
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_malformed_header_falls_back_to_remote_addr(self):
+        self.assertEqual(get_client_ip(self.request('pas-une-ip')), '10.0.0.1')
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_request_log_always_has_a_valid_ip(self):
+        request = self.request("'; DROP TABLE --", remote='')
+        request.start_time = None
+        log = LoggingMiddleware(lambda request: None).build_log(request, HttpResponse(), 0)
+        self.assertEqual(log.ip_address, '0.0.0.0')
+
+
+@override_settings(REQUEST_LOG_ENABLED=False)
+class RouteMetricsTests(TestCase):
+    """Étiquettes des métriques par route (projet9/metrics.py)"""
+
+    def routes(self):
+        return {values[0] for values, _ in metrics.REQUESTS_TOTAL.series()}
+
+    def test_route_label_is_the_url_pattern(self):
+        exam = create_exam()
+        for pk in (exam.pk, exam.pk + 1000):
+            self.client.get(reverse('exam_detail', args=[pk]))
+        routes = self.routes()
+        self.assertIn('/exam/<int:exam_id>/', routes)
+        self.assertFalse(any(str(exam.pk) in route for route in routes))
+
+    def test_unresolved_paths_share_one_label(self):
+        self.client.get('/nexiste/pas/1/')
+        self.client.get('/nexiste/pas/2/')
+        routes = self.routes()
+        self.assertIn('unmatched', routes)
+        self.assertFalse(any(route.startswith('/nexiste') for route in routes))
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_metrics_behind_local_proxy(self):
+        url = reverse('metrics')
+        # Le proxy local ajoute l'IP du client (publique) à un en-tête forgé
+        forged = self.client.get(url, REMOTE_ADDR='127.0.0.1', HTTP_X_FORWARDED_FOR='127.0.0.1, 203.0.113.7')
+        self.assertEqual(forged.status_code, 403)
+        local = self.client.get(url, REMOTE_ADDR='127.0.0.1', HTTP_X_FORWARDED_FOR='127.0.0.1')
+        self.assertEqual(local.status_code, 200)
+
+    def test_metric_base_class_is_abstract(self):
+        with self.assertRaises(TypeError):
+            metrics._Metric('projet9_test', 'Test')
+
+
+@override_settings(SESSION_WRITE_MODE='write_behind')
+class WriteBehindSessionTests(TestCase):
+    """Écriture différée des sessions (exams/session_store.py)"""
+
+    def setUp(self):
+        cache.clear()
+        self.store = session_store.SessionStore()
+        self.store['user'] = 'alice'
+        self.store.save(must_create=True)
+
+    def pending_write(self):
+        """Écriture mise en file par ce worker, pas encore envoyée en base"""
+        self.store['page'] = 2
+        with mock.patch.object(session_store.db_writer, 'submit') as submit:
+            self.store.save()
+        return [call.args[0] for call in submit.call_args_list]
+
+    def test_pending_write_is_flushed(self):
+        session_store._write_sessions(self.pending_write())
+        stored = Session.objects.get(session_key=self.store.session_key)
+        self.assertEqual(stored.get_decoded()['page'], 2)
+
+    def test_logout_on_another_worker_is_not_undone(self):
+        batch = self.pending_write()
+        # Déconnexion traitée par un autre worker avant le vidage de la file
+        session_store.SessionStore(self.store.session_key).delete()
+        session_store._write_sessions(batch)
+        self.assertFalse(Session.objects.filter(session_key=self.store.session_key).exists())
+
+
+class BatchWriterOverflowTests(SimpleTestCase):
+    """Comptage des éléments perdus quand la file est pleine"""
+
+    def writer(self, overflow):
+        writer = BatchWriter('test', lambda batch: None, queue_size=1, overflow=overflow)
+        # File sans thread de vidage : le débordement est déterministe
+        writer._queue, writer._pid = queue.Queue(maxsize=1), os.getpid()
+        return writer
+
+    def test_caller_runs_writes_synchronously(self):
+        written = []
+        writer = self.writer(CALLER_RUNS)
+        writer.flush = written.extend
+        self.assertTrue(writer.submit(1))
+        self.assertTrue(writer.submit(2))
+        self.assertEqual(written, [2])
+        self.assertEqual(writer.dropped, 0)
+
+    def test_drop_oldest_replaces_and_counts_once(self):
+        writer = self.writer(DROP_OLDEST)
+        self.assertTrue(writer.submit(1))
+        self.assertTrue(writer.submit(2))
+        self.assertEqual(writer.dropped, 1)
+        self.assertEqual(writer._queue.get_nowait(), 2)
+
+
+class RescoreInvalidationTests(TestCase):
+    """Le recalcul des scores invalide les statistiques en cache"""
+
+    def test_analytics_follow_rescore(self):
+        from .analytics import get_exam_analytics
+        from .scoring import rescore_sessions
+
+        cache.clear()
+        exam = create_exam()
+        session = ExamSession.objects.create(user=User.objects.create_user('alice'), exam=exam)
+        session.record_answers(answer_key(exam))
+        session.finish()
+        self.assertEqual(get_exam_analytics(exam)['score']['mean'], 100)
+
+        # Corrigé inversé sans signaux, puis recalcul
+        Choice.objects.filter(question__exam=exam).update(is_correct=~models.Q(is_correct=True))
+        with self.captureOnCommitCallbacks(execute=True):
+            rescore_sessions(ExamSession.objects.filter(exam=exam))
+        self.assertEqual(get_exam_analytics(exam)['score']['mean'], 0)
+
+
+@override_settings(REQUEST_LOG_ENABLED=False)
+class ExamAnalyticsViewTests(TestCase):
+    """Page des statistiques d'un examen (staff)"""
+
+    def test_zero_values_are_displayed(self):
+        cache.clear()
+        exam = create_exam()
+        session = ExamSession.objects.create(user=User.objects.create_user('alice'), exam=exam)
+        session.record_answers(answer_key(exam, correct=False))
+        session.finish()
+        self.client.force_login(User.objects.create_user('prof', is_staff=True))
+        response = self.client.get(reverse('exam_analytics', args=[exam.pk]))
+        self.assertContains(response, '>0,0%<', count=2)  # Taux de réussite, score moyen
+        self.assertContains(response, '(σ 0,0)')
+        self.assertContains(response, '>0,0 min<')
+
+
+class ItemAnalysisTests(TestCase):
+    """Analyse d'items (exams/item_analysis.py)"""
+
+    def setUp(self):
+        cache.clear()
+        self.exam = create_exam()
+        self.good, self.bad = answer_key(self.exam), answer_key(self.exam, correct=False)
+        self.first, self.second = list(self.good)
+        session = ExamSession.objects.create(user=User.objects.create_user('alice'), exam=self.exam)
+        session.record_answers({self.first: self.bad[self.first], self.second: self.good[self.second]})
+        session.finish()
+
+    def counts(self):
+        from .item_analysis import compute_item_analysis
+
+        cache.clear()  # Déplacement fait sans signaux : contenu rechargé
+        report = compute_item_analysis(self.exam)
+        return {choice['id']: choice['count'] for item in report['items'] for choice in item['choices']}
+
+    def test_answer_to_a_choice_moved_to_another_exam(self):
+        other = create_exam('Autre', questions=1)
+        Choice.objects.filter(pk=self.bad[self.first]).update(question=other.questions.get())
+        self.assertEqual(self.counts(), {
+            self.good[self.first]: 0, self.good[self.second]: 1, self.bad[self.second]: 0,
+        })
+
+    def test_answer_to_a_choice_moved_within_the_exam(self):
+        Choice.objects.filter(pk=self.bad[self.first]).update(question_id=self.second)
+        counts = self.counts()
+        self.assertEqual(counts[self.bad[self.first]], 0)
+        self.assertEqual(counts[self.good[self.second]], 1)
+
+
+class ImportExamsTests(TestCase):
+    """Validation et réimport (exams/importer.py)"""
+
+    def exam_data(self, correct=0):
+        return [{
+            'external_id': 'algebre',
+            'title': 'Algèbre',
+            'duration': 30,
+            'questions': [{
+                'text': '1 + 1 ?',
+                'choices': [{'text': text, 'is_correct': index == correct} for index, text in enumerate('234')],
+            }],
+        }]
+
+    def test_invalid_structure_raises_import_error(self):
+        from .importer import ExamImportError, import_exams
+
+        for payload in ([1], {'exams': 'x'}, [{'external_id': 'a', 'title': 'A', 'duration': 5, 'questions': [1]}]):
+            with self.subTest(payload=payload), self.assertRaises(ExamImportError):
+                import_exams(payload if isinstance(payload, list) else payload['exams'])
+
+    def test_command_reports_invalid_json_root(self):
+        import tempfile
+
+        from django.core.management import CommandError, call_command
+
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as source:
+            source.write('[1]')
+            source.flush()
+            with self.assertRaises(CommandError):
+                call_command('import_exams', source.name, stdout=io.StringIO(), stderr=io.StringIO())
+
+    def test_json_object_without_exams_key(self):
+        from .importer import ExamImportError, load_json
+
+        with self.assertRaises(ExamImportError):
+            load_json(io.StringIO('{"examens": []}'))
+
+    def test_question_moved_to_another_exam_refreshes_both(self):
+        from .importer import import_exams
+
+        data = self.exam_data()
+        data[0]['questions'][0]['external_id'] = 'q-addition'
+        import_exams(data)
+        old = Exam.objects.get(external_id='algebre')
+        data[0].update(external_id='arithmetique', title='Arithmétique')
+        import_exams(data)
+        old_version = old.updated_at
+        old.refresh_from_db()
+        self.assertEqual((old.num_questions, old.num_points), (0, 0))
+        self.assertNotEqual(old.updated_at, old_version)
+        self.assertEqual(Exam.objects.get(external_id='arithmetique').num_questions, 1)
+
+    def test_reimport_moves_the_correct_answer(self):
+        from .importer import import_exams
+
+        import_exams(self.exam_data(correct=0))
+        import_exams(self.exam_data(correct=2))
+        correct = Choice.objects.filter(question__exam__external_id='algebre', is_correct=True)
+        self.assertEqual(list(correct.values_list('text', flat=True)), ['4'])
+
+    def test_reimport_clears_choices_missing_from_the_file(self):
+        from .importer import import_exams
+
+        import_exams(self.exam_data(correct=2))
+        data = self.exam_data(correct=0)
+        data[0]['questions'][0]['choices'].pop()
+        import_exams(data)
+        correct = Choice.objects.filter(question__exam__external_id='algebre', is_correct=True)
+        self.assertEqual(list(correct.values_list('text', flat=True)), ['2'])
+
+
+class UngradableExamTests(TestCase):
+    """Examen sans points : score None (non notable) par tous les chemins"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.exam = create_exam(questions=0)
+
+    def test_finish_and_deferred_grading_agree(self):
+        from .grading import grade_sessions
+
+        inline = ExamSession.objects.create(user=self.user, exam=self.exam)
+        inline.finish()
+        deferred = ExamSession.objects.create(user=User.objects.create_user('bob'), exam=self.exam)
+        deferred.submit()
+        grade_sessions([deferred.pk])
+
+        scores = ExamSession.objects.filter(exam=self.exam).values_list('status', 'score')
+        self.assertEqual(sorted(scores), [('completed', None), ('completed', None)])
+
+    def test_stats_ignore_ungradable_score(self):
+        ExamSession.objects.create(user=self.user, exam=self.exam).finish()
+        stats = UserExamStats.objects.get(user=self.user)
+        self.assertEqual((stats.exams_taken, stats.score_sum, stats.best_score), (1, 0, None))
+
+
+class ExamAggregatesTests(TestCase):
+    """Agrégats dénormalisés de Exam (exams/aggregates.py, exams/signals.py)"""
+
+    def test_moving_a_question_refreshes_both_exams(self):
+        source, target = create_exam('Source', questions=2, points=2), create_exam('Cible', questions=1, points=3)
+        question = source.questions.first()
+        question.exam = target
+        question.save()
+
+        source.refresh_from_db()
+        target.refresh_from_db()
+        self.assertEqual((source.num_questions, source.num_points), (1, 2))
+        self.assertEqual((target.num_questions, target.num_points), (2, 5))
+
+    def test_moving_a_choice_changes_the_old_exam_version(self):
+        source, target = create_exam('Source'), create_exam('Cible')
+        updated_at = source.updated_at
+        choice = Choice.objects.filter(question__exam=source).first()
+        choice.question = target.questions.first()
+        choice.save()
+        source.refresh_from_db()
+        self.assertGreater(source.updated_at, updated_at)
+
+
+# Routes de l'application avec les vues en lecture seule asynchrones
+# (ce que fait exams/urls.py quand USE_ASYNC_VIEWS est actif)
+ASYNC_READ_VIEWS = ('home', 'exam_list', 'exam_detail', 'dashboard', 'my_results')
+
+
+class AsyncUrlconf:
+    urlpatterns = [
+        path(
+            str(pattern.pattern),
+            getattr(async_views, pattern.name) if pattern.name in ASYNC_READ_VIEWS else pattern.callback,
+            name=pattern.name,
+        )
+        for pattern in urls.urlpatterns
+    ]
+
+
+DJANGO_AUTH = 'django.contrib.auth.middleware.AuthenticationMiddleware'
+MANUAL_AUTH = 'exams.replacements.ManualAuthMiddleware'
+
+
+def middleware_with(auth):
+    """MIDDLEWARE du projet avec le middleware d'authentification `auth`"""
+    return [auth if name in (DJANGO_AUTH, MANUAL_AUTH) else name for name in settings.MIDDLEWARE]
+
+
+@override_settings(
+    USE_ASYNC_VIEWS=True, ROOT_URLCONF=AsyncUrlconf, MIDDLEWARE=middleware_with(DJANGO_AUTH),
+    REQUEST_LOG_ENABLED=False,
+)
+class AsyncReadViewsTests(TestCase):
+    """Vues asynchrones (exams/async_views.py) derrière la pile de middlewares en ASGI"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', password='secret')
+        self.exam = create_exam('Algèbre')
+        ExamSession.objects.create(user=self.user, exam=self.exam).finish()
+
+    async def test_anonymous_pages(self):
+        self.assertIs(resolve(reverse('exam_list')).func, async_views.exam_list)
+        response = await self.async_client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Frame-Options'], 'DENY')
+        response = await self.async_client.get(reverse('exam_list'))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith(settings.LOGIN_URL))
+
+    async def test_read_views_for_a_logged_in_student(self):
+        await self.async_client.aforce_login(self.user)
+        for name, args in [('exam_list', []), ('exam_detail', [self.exam.pk]), ('dashboard', []), ('my_results', [])]:
+            with self.subTest(view=name):
+                response = await self.async_client.get(reverse(name, args=args))
+                self.assertContains(response, 'Algèbre')
+        response = await self.async_client.get(reverse('exam_detail', args=[self.exam.pk + 1000]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_middlewares_see_the_user(self):
+        await self.async_client.aforce_login(self.user)
+        before = metrics.REQUESTS_TOTAL.labels('/exams/', 'GET', 200).value
+        with self.assertLogs('projet9.middleware', 'INFO') as logs:
+            await self.async_client.get(reverse('exam_list'))
+        self.assertTrue(any('User: alice' in line for line in logs.output))
+        self.assertEqual(metrics.REQUESTS_TOTAL.labels('/exams/', 'GET', 200).value, before + 1)
+
+
+@override_settings(MIDDLEWARE=middleware_with(MANUAL_AUTH))
+class AsyncReadViewsManualAuthTests(AsyncReadViewsTests):
+    """Mêmes vues avec ManualAuthMiddleware (utilisateur résolu par request.auser)"""
@@ -1,24 +1,33 @@
 # exams/urls.py
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Vues en lecture seule : versions asynchrones en ASGI (USE_ASYNC_VIEWS)
+read_views = async_views if getattr(settings, 'USE_ASYNC_VIEWS', False) else views
 
 urlpatterns = [
     # Pages publiques
-    path('', views.home, name='home'),
+    path('', read_views.home, name='home'),
     path('register/', views.register, name='register'),
     path('login/', views.user_login, name='login'),
     path('logout/', views.user_logout, name='logout'),
     
     # Pages protégées - Examens
-    path('exams/', views.exam_list, name='exam_list'),
-    path('exam/<int:exam_id>/', views.exam_detail, name='exam_detail'),
+    path('exams/', read_views.exam_list, name='exam_list'),
+    path('exam/<int:exam_id>/', read_views.exam_detail, name='exam_detail'),
     path('exam/<int:exam_id>/start/', views.start_exam, name='start_exam'),
     path('exam/<int:exam_id>/take/', views.take_exam, name='take_exam'),
+    path('exam/<int:exam_id>/autosave/', views.autosave_answer, name='autosave_answer'),
     path('result/<int:session_id>/', views.exam_result, name='exam_result'),
     
+    # Statistiques (staff)
+    path('exam/<int:exam_id>/analytics/', views.exam_analytics, name='exam_analytics'),
+    path('export/results/', views.export_results, name='export_results'),
+    
     # Dashboard et résultats
-    path('dashboard/', views.dashboard, name='dashboard'),
-    path('my-results/', views.my_results, name='my_results'),
+    path('dashboard/', read_views.dashboard, name='dashboard'),
+    path('my-results/', read_views.my_results, name='my_results'),
     
     # Démonstration middlewares
     path('middleware-demo/', views.middleware_demo, name='middleware_demo'),
@@ -0,0 +1,94 @@
+"""
+Numéros de version stockés dans le cache Django, utilisés pour construire
+des clés de cache invalidées par simple incrément (aucune suppression).
+
+Le cache doit être partagé par tous les workers (Redis en production, voir
+CACHES et exams/checks.py) : avec un cache par processus, un incrément ne
+serait vu que par le worker qui l'a fait.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def get_version(key):
+    """Version courante ; une nouvelle valeur unique si le cache a été vidé"""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, 0)
+    return version
+
+
+def bump_version(key):
+    """Passe à la version suivante (invalide toutes les clés qui en dépendent)"""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def exam_results_key(exam_id):
+    return f'exam_results_version:{exam_id}'
+
+
+def exam_results_version(exam_id):
+    """Version des résultats d'un examen (change à chaque session terminée)"""
+    return get_version(exam_results_key(exam_id))
+
+
+def bump_exam_results_version(exam_id):
+    bump_version(exam_results_key(exam_id))
+
+
+async def aget_version(key):
+    """Version asynchrone de get_version (vues ASGI)"""
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key, 0)
+    return version
+
+
+# Catalogue : liste des examens actifs (fragments de exam_list)
+EXAM_CATALOG_KEY = 'exam_catalog_version'
+
+
+def exam_catalog_version():
+    """Version du catalogue (change à chaque modification d'examen, question ou choix)"""
+    return get_version(EXAM_CATALOG_KEY)
+
+
+async def aexam_catalog_version():
+    return await aget_version(EXAM_CATALOG_KEY)
+
+
+def bump_exam_catalog_version():
+    bump_version(EXAM_CATALOG_KEY)
+
+
+# Sessions d'un utilisateur (fragments propres à l'utilisateur) ; l'époque
+# invalide celles de tous les utilisateurs (recalcul des scores en masse)
+USER_SESSIONS_EPOCH_KEY = 'user_sessions_epoch'
+
+
+def user_sessions_key(user_id):
+    return f'user_sessions_version:{user_id}'
+
+
+def user_sessions_version(user_id):
+    """Version des sessions d'un utilisateur (change quand une session commence ou se termine)"""
+    return f'{get_version(USER_SESSIONS_EPOCH_KEY)}.{get_version(user_sessions_key(user_id))}'
+
+
+async def auser_sessions_version(user_id):
+    epoch = await aget_version(USER_SESSIONS_EPOCH_KEY)
+    return f'{epoch}.{await aget_version(user_sessions_key(user_id))}'
+
+
+def bump_user_sessions_version(user_id):
+    bump_version(user_sessions_key(user_id))
+
+
+def bump_all_user_sessions_versions():
+    bump_version(USER_SESSIONS_EPOCH_KEY)
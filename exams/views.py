@@ -1,19 +1,27 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import login, logout, authenticate
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Count, Avg
-from .models import Exam, Question, ExamSession, Answer, RequestLog
+from .models import Exam, Question, Choice, ExamSession, Answer, RequestLog, UserExamStats
+from . import grading
+from .content_cache import get_exam_content
+from .counters import ACTIVE_EXAMS, DISTINCT_STUDENTS, get_counters
+from .versions import exam_catalog_version, user_sessions_version
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.views.decorators.http import require_POST
+import json
 
 
 def home(request):
     """Page d'accueil"""
+    # Compteurs maintenus incrémentalement et mis en cache
+    counters = get_counters()
     context = {
-        'total_exams': Exam.objects.filter(is_active=True).count(),
-        'total_students': ExamSession.objects.values('user').distinct().count(),
+        'total_exams': counters[ACTIVE_EXAMS],
+        'total_students': counters[DISTINCT_STUDENTS],
     }
     return render(request, 'exams/home.html', context)
 
@@ -75,17 +83,19 @@ def user_logout(request):
 @login_required
 def exam_list(request):
     """Liste de tous les examens disponibles"""
-    exams = Exam.objects.filter(is_active=True).annotate(
-        num_questions=Count('questions')
-    )
+    exams = Exam.objects.filter(is_active=True)
     
     # Récupérer les sessions de l'utilisateur
     user_sessions = ExamSession.objects.filter(user=request.user)
-    completed_exam_ids = user_sessions.filter(status='completed').values_list('exam_id', flat=True)
+    completed_exam_ids = user_sessions.filter(status='completed').order_by().values_list('exam_id', flat=True)
     
+    # Querysets paresseux : évalués seulement si le fragment n'est pas en cache
     context = {
         'exams': exams,
-        'completed_exam_ids': list(completed_exam_ids),
+        'completed_exam_ids': completed_exam_ids,
+        'catalog_version': exam_catalog_version(),
+        'sessions_version': user_sessions_version(request.user.pk),
+        'fragment_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
     }
     return render(request, 'exams/exam_list.html', context)
 
@@ -95,12 +105,14 @@ def exam_detail(request, exam_id):
     """Détails d'un examen"""
     exam = get_object_or_404(Exam, id=exam_id, is_active=True)
     
-    # Vérifier si l'utilisateur a déjà une session pour cet examen
-    existing_session = ExamSession.objects.filter(user=request.user, exam=exam).first()
+    # Session existante, chargée seulement si le fragment n'est pas en cache
+    existing_session = ExamSession.objects.filter(user=request.user, exam=exam).first
     
     context = {
         'exam': exam,
         'existing_session': existing_session,
+        'sessions_version': user_sessions_version(request.user.pk),
+        'fragment_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
     }
     return render(request, 'exams/exam_detail.html', context)
 
@@ -114,7 +126,7 @@ def start_exam(request, exam_id):
     existing_session = ExamSession.objects.filter(user=request.user, exam=exam).first()
     
     if existing_session:
-        if existing_session.status == 'completed':
+        if existing_session.status in ('completed', 'grading'):
             messages.warning(request, "Vous avez déjà passé cet examen.")
             return redirect('exam_result', session_id=existing_session.id)
         else:
@@ -148,27 +160,30 @@ def take_exam(request, exam_id):
         return redirect('exam_detail', exam_id=exam.id)
     
     session = get_object_or_404(ExamSession, id=session_id, user=request.user, exam=exam)
+    session.exam = exam  # Réutiliser l'examen déjà chargé
     
-    if session.status == 'completed':
+    if session.status in ('completed', 'grading'):
         messages.warning(request, "Cet examen est déjà terminé.")
         return redirect('exam_result', session_id=session.id)
     
+    # Contenu de l'examen (questions, choix, corrigé) depuis le cache
+    content = get_exam_content(exam)
+    
     if request.method == 'POST':
-        # Traiter les réponses
-        for question in exam.questions.all():
-            choice_id = request.POST.get(f'question_{question.id}')
-            if choice_id:
-                choice = get_object_or_404(question.choices, id=choice_id)
-                
-                # Créer ou mettre à jour la réponse
-                Answer.objects.update_or_create(
-                    session=session,
-                    question=question,
-                    defaults={'choice': choice}
-                )
+        # Traiter les réponses (validation + upsert groupés) : toujours, car
+        # des sauvegardes automatiques traitées dans le désordre ont pu
+        # laisser en base une réponse plus ancienne que celle du formulaire
+        try:
+            session.record_answers(get_posted_choices(request.POST), content=content)
+        except Choice.DoesNotExist:
+            raise Http404("Choix de réponse invalide.")
         
-        # Terminer la session
-        session.finish()
+        # Terminer la session : notée tout de suite ou mise en file de correction
+        if grading.is_deferred():
+            session.submit()
+            grading.enqueue(session.id)
+        else:
+            session.finish(content=content)
         
         # Nettoyer la session Django
         if 'current_exam_session_id' in request.session:
@@ -180,37 +195,80 @@ def take_exam(request, exam_id):
         return redirect('exam_result', session_id=session.id)
     
     # Récupérer les réponses déjà données
-    answered_questions = Answer.objects.filter(session=session).values_list('question_id', 'choice_id')
+    answered_questions = Answer.objects.filter(session=session).order_by().values_list('question_id', 'choice_id')
     answered_dict = dict(answered_questions)
     
-    questions = exam.questions.prefetch_related('choices').all()
-    
     context = {
         'exam': exam,
-        'questions': questions,
+        'questions': content['questions'],
         'session': session,
         'answered_dict': answered_dict,
+        # Cochées côté client : le fragment des questions est commun à tous
+        'answered_choice_ids': list(answered_dict.values()),
+        'fragment_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
     }
     return render(request, 'exams/take_exam.html', context)
 
 
+@login_required
+@require_POST
+def autosave_answer(request, exam_id):
+    """Enregistre une réponse pendant l'examen (JSON {"question": id, "choice": id})"""
+    try:
+        data = json.loads(request.body)
+        question_id, choice_id = int(data['question']), int(data['choice'])
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': "Requête invalide."}, status=400)
+    
+    session = ExamSession.objects.select_related('exam').filter(
+        id=request.session.get('current_exam_session_id'),
+        user=request.user,
+        exam_id=exam_id,
+        status='in_progress',
+    ).first()
+    if session is None:
+        return JsonResponse({'error': "Aucune session d'examen en cours."}, status=409)
+    
+    # Validation sur le contenu en cache, puis un seul upsert
+    try:
+        session.record_answers({question_id: choice_id}, content=get_exam_content(session.exam))
+    except Choice.DoesNotExist:
+        return JsonResponse({'error': "Choix de réponse invalide."}, status=400)
+    return HttpResponse(status=204)
+
+
 @login_required
 def exam_result(request, session_id):
     """Afficher les résultats d'un examen"""
-    session = get_object_or_404(ExamSession, id=session_id, user=request.user)
+    session = get_object_or_404(ExamSession.objects.select_related('exam'), id=session_id, user=request.user)
     
-    # Récupérer toutes les réponses avec les questions et choix
-    answers = session.answers.select_related('question', 'choice').all()
+    # Correction différée pas encore terminée : la page se recharge
+    if session.status == 'grading':
+        grading.ensure_queued(session)
+        return render(request, 'exams/result.html', {'session': session, 'grading': True})
+    
+    # Questions, choix et corrigé depuis le cache : aucune requête par réponse
+    content = get_exam_content(session.exam)
+    answered = dict(session.answers.order_by().values_list('question_id', 'choice_id'))
+    choices = {
+        choice['id']: choice
+        for question in content['questions']
+        for choice in question['choices']
+    }
     
     # Créer une liste de résultats détaillés
     results = []
-    for answer in answers:
+    for question in content['questions']:
+        if question['id'] not in answered:
+            continue
+        choice_id = answered[question['id']]
+        is_correct = choice_id in content['correct_choices']
         results.append({
-            'question': answer.question,
-            'user_choice': answer.choice,
-            'correct_choice': answer.question.correct_choice,
-            'is_correct': answer.is_correct,
-            'points': answer.question.points if answer.is_correct else 0,
+            'question': question,
+            'user_choice': choices.get(choice_id),
+            'correct_choice': choices.get(content['answer_key'].get(question['id'])),
+            'is_correct': is_correct,
+            'points': question['points'] if is_correct else 0,
         })
     
     context = {
@@ -239,19 +297,8 @@ def my_results(request):
 @login_required
 def dashboard(request):
     """Tableau de bord de l'utilisateur"""
-    # Statistiques de l'utilisateur
-    total_exams_taken = ExamSession.objects.filter(user=request.user, status='completed').count()
-    total_exams_passed = ExamSession.objects.filter(
-        user=request.user, 
-        status='completed',
-        score__gte=60
-    ).count()
-    
-    # Moyenne des scores
-    avg_score = ExamSession.objects.filter(
-        user=request.user,
-        status='completed'
-    ).aggregate(Avg('score'))['score__avg'] or 0
+    # Statistiques matérialisées de l'utilisateur (une seule ligne)
+    stats = UserExamStats.objects.filter(user=request.user).first() or UserExamStats(user=request.user)
     
     # Dernières sessions
     recent_sessions = ExamSession.objects.filter(
@@ -259,23 +306,77 @@ def dashboard(request):
     ).select_related('exam').order_by('-started_at')[:5]
     
     context = {
-        'total_exams_taken': total_exams_taken,
-        'total_exams_passed': total_exams_passed,
-        'avg_score': round(avg_score, 2),
+        'total_exams_taken': stats.exams_taken,
+        'total_exams_passed': stats.exams_passed,
+        'avg_score': round(stats.average_score, 2),
         'recent_sessions': recent_sessions,
     }
     return render(request, 'exams/dashboard.html', context)
 
 
+@login_required
+@user_passes_test(lambda user: user.is_staff)
+def exam_analytics(request, exam_id):
+    """Statistiques d'un examen sur toutes ses sessions terminées (staff)"""
+    from .analytics import get_exam_analytics
+    
+    exam = get_object_or_404(Exam, id=exam_id)
+    analytics = get_exam_analytics(exam)
+    
+    if request.GET.get('format') == 'json':
+        return JsonResponse(analytics)
+    
+    context = {
+        'exam': exam,
+        'analytics': analytics,
+    }
+    return render(request, 'exams/exam_analytics.html', context)
+
+
+@login_required
+@user_passes_test(lambda user: user.is_staff)
+def export_results(request):
+    """Export en streaming des sessions terminées et de leurs réponses (staff)"""
+    from .export import CONTENT_TYPES, FORMATS, iter_export, parse_bound
+    
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in FORMATS:
+        return HttpResponseBadRequest("Format inconnu (csv ou jsonl).")
+    try:
+        exam_id = int(request.GET['exam']) if request.GET.get('exam') else None
+        since = parse_bound(request.GET.get('since'))
+        until = parse_bound(request.GET.get('until'), end=True)
+    except ValueError:
+        return HttpResponseBadRequest("Paramètres d'export invalides.")
+    
+    response = StreamingHttpResponse(
+        iter_export(export_format, exam_id=exam_id, since=since, until=until),
+        content_type=CONTENT_TYPES[export_format],
+    )
+    filename = f"resultats{f'-examen-{exam_id}' if exam_id else ''}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+# Fonction utilitaire pour lire les réponses d'un formulaire d'examen
+def get_posted_choices(data):
+    """Retourne {question_id: choice_id} à partir des champs 'question_<id>'"""
+    choices = {}
+    for key, value in data.items():
+        if not key.startswith('question_') or not value:
+            continue
+        try:
+            choices[int(key[len('question_'):])] = int(value)
+        except ValueError:
+            raise Http404("Choix de réponse invalide.")
+    return choices
+
+
 # Fonction utilitaire pour récupérer l'IP du client
 def get_client_ip(request):
-    """Récupère l'adresse IP du client"""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
+    """Récupère l'adresse IP du client (validée, voir projet9.middleware)"""
+    from projet9.middleware import get_client_ip
+    return get_client_ip(request)
 
 
 # Vue pour la démonstration des middlewares
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'projet9.settings')
+# Servi par un serveur ASGI (uvicorn) : vues asynchrones (exams/async_views.py)
+os.environ.setdefault('USE_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
@@ -0,0 +1,149 @@
+"""
+Écriture asynchrone par lots.
+
+Un BatchWriter reçoit des éléments dans une file bornée en mémoire ; un
+thread d'arrière-plan les regroupe et appelle `flush(batch)` dès que le lot
+est plein ou que `flush_interval` secondes se sont écoulées.
+"""
+import atexit
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+from django.db import close_old_connections
+
+logger = logging.getLogger('projet9.batching')
+
+DROP_NEW = 'drop_new'        # File pleine : l'élément entrant est ignoré
+DROP_OLDEST = 'drop_oldest'  # File pleine : le plus ancien est remplacé
+CALLER_RUNS = 'caller_runs'  # File pleine : écrit tout de suite par l'appelant (aucune perte)
+
+
+class BatchWriter:
+    """File bornée vidée par lots par un thread d'arrière-plan"""
+
+    def __init__(self, name, flush, queue_size=10000, batch_size=500,
+                 flush_interval=2.0, overflow=DROP_NEW, sample_rate=1.0):
+        if overflow not in (DROP_NEW, DROP_OLDEST, CALLER_RUNS):
+            raise ValueError(f"Politique de débordement inconnue : {overflow}")
+        self.name = name
+        self.flush = flush
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.sample_rate = sample_rate
+
+        self.written = 0
+        self.dropped = 0
+        self.skipped = 0
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        atexit.register(self.close)
+
+    def submit(self, item):
+        """
+        Ajoute un élément sans bloquer la requête, sauf avec CALLER_RUNS où
+        une file pleine fait écrire l'élément de manière synchrone (une
+        erreur d'écriture remonte alors à l'appelant).
+        """
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.skipped += 1
+            return False
+
+        q = self._ensure_started()
+        try:
+            q.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+
+        if self.overflow == CALLER_RUNS:
+            # Pas de close_old_connections() : la connexion est celle de la requête
+            self.flush([item])
+            self.written += 1
+            return True
+        if self.overflow == DROP_OLDEST:
+            # Chaque élément perdu n'est compté qu'une fois : l'ancien s'il a
+            # été retiré, l'entrant s'il n'a toujours pas trouvé de place
+            try:
+                q.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            try:
+                q.put_nowait(item)
+                return True
+            except queue.Full:
+                pass
+        self.dropped += 1
+        return False
+
+    def pending(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def close(self, timeout=5.0):
+        """Vide ce qui reste dans la file (appelé à l'arrêt du processus)"""
+        if self._queue is None or self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        while self.pending() and time.monotonic() < deadline:
+            self._write(self._drain(block=False))
+
+    def _ensure_started(self):
+        # Après un fork (gunicorn), le thread du parent n'existe plus
+        if self._pid == os.getpid():
+            return self._queue
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.queue_size)
+                self._thread = threading.Thread(
+                    target=self._run, name=f'batch-writer-{self.name}', daemon=True
+                )
+                self._pid = os.getpid()
+                self._thread.start()
+        return self._queue
+
+    def _run(self):
+        while True:
+            batch = self._drain(block=True)
+            if batch:
+                self._write(batch)
+
+    def _drain(self, block):
+        """Collecte un lot : jusqu'à batch_size éléments ou flush_interval"""
+        batch = []
+        q = self._queue
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if not block or timeout <= 0:
+                try:
+                    batch.append(q.get_nowait())
+                    continue
+                except queue.Empty:
+                    break
+            try:
+                batch.append(q.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        if not batch:
+            return
+        close_old_connections()
+        try:
+            self.flush(batch)
+            self.written += len(batch)
+        except Exception:
+            self.dropped += len(batch)
+            logger.exception(f"Écriture du lot '{self.name}' impossible ({len(batch)} éléments perdus)")
+        finally:
+            close_old_connections()
@@ -0,0 +1,268 @@
+"""
+Test de charge local : une cohorte d'étudiants virtuels passe un examen.
+
+L'application WSGI est servie dans le processus (serveur multi-thread de
+Django sur un port libre) et chaque étudiant virtuel, exécuté dans un pool
+de threads, enchaîne le parcours complet avec des temps de réflexion :
+login → exam_list → start_exam → take_exam (GET) → take_exam (POST) →
+exam_result.
+
+Chaque réponse porte l'en-tête X-DB-Queries (ajouté par le wrapper WSGI de
+ce module), ce qui permet de totaliser les requêtes SQL par étape.
+"""
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+
+QUERIES_HEADER = 'X-DB-Queries'
+STEPS = ['login_form', 'login', 'exam_list', 'start_exam', 'take_exam', 'submit', 'exam_result']
+
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+EXAM_LINK_RE = re.compile(r'href="/exam/(\d+)/"')
+CHOICE_RE = re.compile(r'name="question_(\d+)"\s+value="(\d+)"')
+
+
+def count_queries(app):
+    """Wrapper WSGI : ajoute le nombre de requêtes SQL de la requête en en-tête"""
+    def wrapped(environ, start_response):
+        executed = [0]
+
+        def counter(execute, sql, params, many, context):
+            executed[0] += 1
+            return execute(sql, params, many, context)
+
+        def start(status, headers, exc_info=None):
+            headers.append((QUERIES_HEADER, str(executed[0])))
+            return start_response(status, headers, exc_info)
+
+        with connection.execute_wrapper(counter):
+            return app(environ, start)
+    return wrapped
+
+
+def allowed_host():
+    """
+    En-tête Host accepté par ALLOWED_HOSTS : le serveur écoute sur
+    127.0.0.1, mais Django rejette (400) un Host qui n'y figure pas.
+    """
+    hosts = settings.ALLOWED_HOSTS
+    if not hosts or '*' in hosts:
+        # Liste vide : Django accepte localhost en DEBUG
+        return 'localhost'
+    for host in ('localhost', '127.0.0.1'):
+        if host in hosts:
+            return host
+    # Premier nom explicite (un motif « .exemple.fr » accepte exemple.fr)
+    return hosts[0].lstrip('.')
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalServer:
+    """Serveur WSGI multi-thread sur 127.0.0.1, port choisi par le système"""
+
+    def __init__(self):
+        self.httpd = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler, allow_reuse_address=False)
+        self.httpd.set_app(count_queries(get_wsgi_application()))
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='loadtest-server', daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class StepStats:
+    """Mesures d'une étape du parcours (thread-safe)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.queries = 0
+        self.errors = 0
+        self.statuses = {}
+
+    def add(self, latency, queries, error, status=None):
+        with self.lock:
+            self.latencies.append(latency)
+            self.queries += queries
+            self.errors += error
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        return {
+            'requests': count,
+            'errors': self.errors,
+            'error_rate': round(self.errors / count * 100, 2) if count else 0,
+            'statuses': {str(status or 'erreur réseau'): n for status, n in sorted(self.statuses.items(), key=str)},
+            'p50_ms': _percentile(latencies, 50),
+            'p95_ms': _percentile(latencies, 95),
+            'p99_ms': _percentile(latencies, 99),
+            'max_ms': round(latencies[-1], 2) if count else None,
+            'queries': self.queries,
+            'queries_per_request': round(self.queries / count, 2) if count else 0,
+        }
+
+
+class StepError(Exception):
+    pass
+
+
+class VirtualStudent:
+    """Un étudiant : cookies propres, parcours complet avec temps de réflexion"""
+
+    def __init__(self, port, username, password, stats, think_time, rng, host='localhost'):
+        self.port = port
+        self.host = host
+        self.username = username
+        self.password = password
+        self.stats = stats
+        self.think_time = think_time
+        self.rng = rng
+        self.cookies = {}
+
+    def request(self, step, method, path, data=None, expect=200):
+        """Exécute une requête HTTP mesurée ; retourne (en-têtes, corps)"""
+        body = urlencode(data) if data is not None else None
+        headers = {
+            'Host': self.host,
+            'Cookie': '; '.join(f'{key}={value}' for key, value in self.cookies.items()),
+        }
+        if body is not None:
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        http = HTTPConnection('127.0.0.1', self.port, timeout=60)
+        start = time.perf_counter()
+        try:
+            http.request(method, path, body=body, headers=headers)
+            response = http.getresponse()
+            content = response.read().decode('utf-8', 'replace')
+        except OSError as error:
+            self.stats[step].add((time.perf_counter() - start) * 1000, 0, 1)
+            raise StepError(f'{step} : {error}')
+        finally:
+            http.close()
+        latency = (time.perf_counter() - start) * 1000
+
+        for header in response.headers.get_all('Set-Cookie') or []:
+            for key, morsel in SimpleCookie(header).items():
+                if morsel.value and morsel['max-age'] != '0':
+                    self.cookies[key] = morsel.value
+                else:
+                    self.cookies.pop(key, None)
+
+        error = response.status != expect
+        self.stats[step].add(latency, int(response.getheader(QUERIES_HEADER, 0)), error, response.status)
+        if error:
+            raise StepError(f'{step} : statut {response.status} (attendu {expect})')
+        return response.headers, content
+
+    def think(self):
+        if self.think_time:
+            time.sleep(self.rng.expovariate(1 / self.think_time))
+
+    def run(self):
+        """Parcours complet ; retourne True s'il s'est déroulé sans erreur"""
+        try:
+            _, page = self.request('login_form', 'GET', '/login/')
+            self.request('login', 'POST', '/login/', {
+                'username': self.username,
+                'password': self.password,
+                'csrfmiddlewaretoken': _csrf_token(page),
+            }, expect=302)
+            self.think()
+
+            _, page = self.request('exam_list', 'GET', '/exams/')
+            exam_ids = sorted(set(EXAM_LINK_RE.findall(page)))
+            if not exam_ids:
+                raise StepError('exam_list : aucun examen')
+            exam_id = self.rng.choice(exam_ids)
+            self.think()
+
+            self.request('start_exam', 'GET', f'/exam/{exam_id}/start/', expect=302)
+            _, page = self.request('take_exam', 'GET', f'/exam/{exam_id}/take/')
+            choices = {}
+            for question_id, choice_id in CHOICE_RE.findall(page):
+                choices.setdefault(question_id, []).append(choice_id)
+            self.think()
+
+            data = {f'question_{question_id}': self.rng.choice(options) for question_id, options in choices.items()}
+            data['csrfmiddlewaretoken'] = _csrf_token(page)
+            headers, _ = self.request('submit', 'POST', f'/exam/{exam_id}/take/', data, expect=302)
+            self.request('exam_result', 'GET', urlsplit(headers['Location']).path)
+            return True
+        except StepError:
+            return False
+
+
+def run_load_test(students, concurrency, think_time=1.0, ramp_up=0.0, seed=42,
+                  password=None, usernames=None):
+    """
+    Lance la cohorte contre un serveur local et retourne le rapport :
+    débit, latences et erreurs par étape, requêtes SQL.
+    """
+    stats = {step: StepStats() for step in STEPS}
+    rng = random.Random(seed)
+    host = allowed_host()
+
+    with LocalServer() as server:
+        def student(index):
+            if ramp_up:
+                time.sleep(ramp_up * index / students)
+            return VirtualStudent(
+                server.port, usernames[index], password, stats, think_time,
+                random.Random(rng.random() + index), host=host,
+            ).run()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='student') as pool:
+            outcomes = list(pool.map(student, range(students)))
+        elapsed = time.perf_counter() - start
+
+    requests = sum(len(step.latencies) for step in stats.values())
+    errors = sum(step.errors for step in stats.values())
+    return {
+        'students': students,
+        'concurrency': concurrency,
+        'think_time': think_time,
+        'duration_s': round(elapsed, 2),
+        'completed': sum(outcomes),
+        'failed': students - sum(outcomes),
+        'flows_per_s': round(sum(outcomes) / elapsed, 2),
+        'requests_per_s': round(requests / elapsed, 2),
+        'error_rate': round(errors / requests * 100, 2) if requests else 0,
+        'queries': sum(step.queries for step in stats.values()),
+        'steps': {name: step.summary() for name, step in stats.items()},
+    }
+
+
+def _csrf_token(page):
+    match = CSRF_RE.search(page)
+    return match.group(1) if match else ''
+
+
+def _percentile(values, percentile):
+    if not values:
+        return None
+    index = (len(values) - 1) * percentile / 100
+    low = int(index)
+    high = min(low + 1, len(values) - 1)
+    return round(values[low] + (values[high] - values[low]) * (index - low), 2)
@@ -0,0 +1,263 @@
+"""
+Métriques applicatives en mémoire du processus, exposées au format texte
+Prometheus sur /metrics.
+
+- Compteurs, jauges et histogrammes avec étiquettes (labels)
+- Durées mesurées avec une horloge monotone (time.perf_counter)
+- Quantiles p50/p95/p99 estimés à partir des buckets de l'histogramme
+"""
+import bisect
+import threading
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _CounterValue:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set(self, value):
+        self.value = value
+
+
+class _HistogramValue:
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Dernier bucket : +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+    def quantile(self, q):
+        """Estimation par interpolation linéaire dans le bucket (comme histogram_quantile)"""
+        counts, _, count = self.snapshot()
+        if not count:
+            return None
+        rank = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            if cumulative + bucket_count >= rank:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index]
+                if not bucket_count:
+                    return upper
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+
+class _Metric(ABC):
+    """
+    Famille de séries (une par combinaison de valeurs d'étiquettes) ; chaque
+    type fournit la valeur d'une série (_new_child) et son rendu (render)
+    """
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    def series(self):
+        return sorted(self._children.items())
+
+    @abstractmethod
+    def _new_child(self):
+        """Valeur d'une nouvelle série"""
+
+    @abstractmethod
+    def render(self):
+        """Lignes au format texte Prometheus"""
+
+    def _label_str(self, values, extra=()):
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ''
+        body = ','.join(f'{name}="{_escape(value)}"' for name, value in pairs)
+        return '{' + body + '}'
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def render(self):
+        for values, child in self.series():
+            yield f'{self.name}{self._label_str(values)} {child.value}'
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def render(self):
+        if self.callback is not None:
+            self.set(self.callback())
+        yield from super().render()
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def render(self):
+        for values, child in self.series():
+            counts, total, count = child.snapshot()
+            cumulative = 0
+            for upper, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if upper == float('inf') else repr(upper)
+                yield f'{self.name}_bucket{self._label_str(values, [("le", le)])} {cumulative}'
+            yield f'{self.name}_sum{self._label_str(values)} {total}'
+            yield f'{self.name}_count{self._label_str(values)} {count}'
+
+    def render_quantiles(self):
+        """Série jauge supplémentaire `<nom>_quantile` (p50/p95/p99)"""
+        for values, child in self.series():
+            for q in QUANTILES:
+                value = child.quantile(q)
+                if value is not None:
+                    yield f'{self.name}_quantile{self._label_str(values, [("quantile", q)])} {value}'
+
+
+class Registry:
+    """Ensemble des métriques du processus"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), callback=None):
+        return self._register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render())
+            if isinstance(metric, Histogram):
+                lines.append(f'# HELP {metric.name}_quantile Quantiles estimés de {metric.name}')
+                lines.append(f'# TYPE {metric.name}_quantile gauge')
+                lines.extend(metric.render_quantiles())
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.histogram(
+    'projet9_request_duration_seconds',
+    'Durée de traitement des requêtes par route',
+    ['route'],
+)
+REQUESTS_TOTAL = registry.counter(
+    'projet9_requests_total',
+    'Nombre de requêtes par route, méthode et code de statut',
+    ['route', 'method', 'status'],
+)
+REQUESTS_IN_FLIGHT = registry.gauge(
+    'projet9_requests_in_flight',
+    'Requêtes en cours de traitement',
+)
+
+
+def metrics_view(request):
+    """
+    Expose les métriques au format texte Prometheus. L'IP autorisée est celle
+    du client (get_client_ip), pas REMOTE_ADDR : derrière un proxy local,
+    REMOTE_ADDR vaut 127.0.0.1 pour toutes les requêtes.
+    """
+    from .middleware import get_client_ip  # projet9.middleware importe ce module
+
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', ('127.0.0.1', '::1'))
+    user = getattr(request, 'user', None)
+    is_staff = user is not None and user.is_authenticated and user.is_staff
+    if get_client_ip(request) not in allowed_ips and not is_staff:
+        return HttpResponseForbidden("403 Forbidden")
+
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
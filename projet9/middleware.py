@@ -1,18 +1,263 @@
 """
 Middlewares personnalisés pour la démonstration
 """
+import ipaddress
 import logging
+import random
+import time
+from datetime import datetime, timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, connections
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject, empty
 from django.shortcuts import render
+from django.urls import Resolver404, resolve
 from django.utils import timezone
 
+from . import metrics, profiling
+from .batching import BatchWriter
+
 logger = logging.getLogger('projet9.middleware')
 
 
-class LoggingMiddleware(MiddlewareMixin):
+def get_client_ip(request):
+    """
+    Adresse IP du client, validée : X-Forwarded-For n'est lu que derrière
+    TRUSTED_PROXY_COUNT proxys de confiance (sinon REMOTE_ADDR). Retourne
+    None si aucune adresse valide (un en-tête forgé ne doit pas faire
+    échouer l'insertion groupée des RequestLog).
+    """
+    proxies = getattr(settings, 'TRUSTED_PROXY_COUNT', 0)
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if proxies and forwarded:
+        # Chaque proxy ajoute à droite l'adresse de son client : seule
+        # l'entrée ajoutée par le premier proxy de confiance est fiable
+        hops = forwarded.split(',')
+        if len(hops) >= proxies:
+            ip = _valid_ip(hops[-proxies])
+            if ip:
+                return ip
+    return _valid_ip(request.META.get('REMOTE_ADDR'))
+
+
+def _valid_ip(value):
+    try:
+        return str(ipaddress.ip_address((value or '').strip()))
+    except ValueError:
+        return None
+
+
+def _write_request_logs(batch):
+    """Insère un lot de RequestLog en une requête"""
+    from exams.models import RequestLog
+    RequestLog.objects.bulk_create(batch)
+
+
+request_log_writer = BatchWriter(
+    'request-log',
+    _write_request_logs,
+    queue_size=getattr(settings, 'REQUEST_LOG_QUEUE_SIZE', 10000),
+    batch_size=getattr(settings, 'REQUEST_LOG_BATCH_SIZE', 500),
+    flush_interval=getattr(settings, 'REQUEST_LOG_FLUSH_INTERVAL', 2.0),
+    overflow=getattr(settings, 'REQUEST_LOG_OVERFLOW', 'drop_new'),
+    sample_rate=getattr(settings, 'REQUEST_LOG_SAMPLE_RATE', 1.0),
+)
+
+def _write_user_activity(batch):
+    """Upsert de la dernière activité connue de chaque utilisateur du lot"""
+    from exams.models import UserActivity
+    latest = {}
+    for user_id, last_activity, ip in batch:
+        latest[user_id] = UserActivity(user_id=user_id, last_activity=last_activity, ip_address=ip)
+    unique_fields = None
+    if connection.features.supports_update_conflicts_with_target:
+        unique_fields = ['user']
+    UserActivity.objects.bulk_create(
+        latest.values(),
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=['last_activity', 'ip_address'],
+    )
+
+
+activity_writer = BatchWriter(
+    'user-activity',
+    _write_user_activity,
+    batch_size=getattr(settings, 'SESSION_ACTIVITY_BATCH_SIZE', 500),
+    flush_interval=getattr(settings, 'SESSION_ACTIVITY_FLUSH_INTERVAL', 5.0),
+    overflow='drop_oldest',
+)
+
+metrics.registry.gauge(
+    'projet9_request_log_written', 'RequestLog écrits par le writer en arrière-plan',
+    callback=lambda: request_log_writer.written,
+)
+metrics.registry.gauge(
+    'projet9_request_log_dropped', 'RequestLog perdus (file pleine ou erreur)',
+    callback=lambda: request_log_writer.dropped,
+)
+metrics.registry.gauge(
+    'projet9_request_log_pending', 'RequestLog en attente dans la file',
+    callback=lambda: request_log_writer.pending(),
+)
+
+
+class AsyncMiddlewareMixin(MiddlewareMixin):
+    """
+    MiddlewareMixin sans passage par un thread en ASGI.
+    
+    MiddlewareMixin exécute process_request / process_response via
+    sync_to_async quand la pile est asynchrone. Ici, aprocess_request /
+    aprocess_response s'exécutent dans la boucle d'événements ; par défaut
+    ils appellent les hooks synchrones, qui ne doivent alors faire aucun
+    accès bloquant (sinon : redéfinir la version asynchrone).
+    """
+    
+    def __call__(self, request):
+        if self.async_mode:
+            return self.acall(request)
+        return super().__call__(request)
+    
+    async def acall(self, request):
+        response = await self.aprocess_request(request)
+        response = response or await self.get_response(request)
+        return await self.aprocess_response(request, response)
+    
+    async def aprocess_request(self, request):
+        if hasattr(self, 'process_request'):
+            return self.process_request(request)
+        return None
+    
+    async def aprocess_response(self, request, response):
+        if hasattr(self, 'process_response'):
+            return self.process_response(request, response)
+        return response
+
+
+async def resolve_user(request):
+    """
+    Résout request.user sans accès bloquant à la base (ASGI) : un
+    utilisateur paresseux pas encore chargé l'est via request.auser(), puis
+    remplace request.user pour que vues et templates le lisent en mémoire.
+    """
+    user = getattr(request, 'user', None)
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty and hasattr(request, 'auser'):
+        request.user = user = await request.auser()
+    return user
+
+
+def is_instrumented(request):
+    """
+    Faux pour les routes exclues de la journalisation, du profilage et des
+    métriques (INSTRUMENTATION_EXCLUDED_URL_NAMES). La route n'est résolue
+    par Django qu'après les process_request : elle l'est ici une fois et le
+    résultat est mémorisé sur la requête.
+    """
+    instrumented = getattr(request, '_instrumented', None)
+    if instrumented is None:
+        excluded = getattr(settings, 'INSTRUMENTATION_EXCLUDED_URL_NAMES', ())
+        match = getattr(request, 'resolver_match', None)
+        if match is None and excluded:
+            try:
+                match = resolve(request.path_info, getattr(request, 'urlconf', None))
+            except Resolver404:
+                match = None
+        instrumented = request._instrumented = match is None or match.url_name not in excluded
+    return instrumented
+
+
+def route_label(request):
+    """
+    Étiquette « route » des métriques : le motif d'URL (/exam/<int:exam_id>/)
+    et jamais le chemin brut, pour garder un nombre de séries borné ; les
+    requêtes non résolues (404) partagent l'étiquette 'unmatched'
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return '/' + match.route
+
+
+class MetricsMiddleware(AsyncMiddlewareMixin):
+    """Middleware qui alimente les métriques par route (voir projet9/metrics.py)"""
+    
+    def process_request(self, request):
+        if not is_instrumented(request):
+            return None
+        request.metrics_start = time.perf_counter()
+        metrics.REQUESTS_IN_FLIGHT.inc()
+        return None
+    
+    def process_response(self, request, response):
+        start = getattr(request, 'metrics_start', None)
+        if start is not None:
+            duration = time.perf_counter() - start
+            metrics.REQUESTS_IN_FLIGHT.dec()
+            
+            route = route_label(request)
+            metrics.REQUEST_LATENCY.labels(route).observe(duration)
+            metrics.REQUESTS_TOTAL.labels(route, request.method, response.status_code).inc()
+        return response
+
+
+class QueryProfilerMiddleware(AsyncMiddlewareMixin):
+    """
+    Middleware de profilage SQL (voir projet9/profiling.py), actif sur une
+    fraction des requêtes : QUERY_PROFILER_SAMPLE_RATE (0 = désactivé).
+    """
+    
+    def is_sampled(self, request):
+        sample_rate = getattr(settings, 'QUERY_PROFILER_SAMPLE_RATE', 0.0)
+        return bool(sample_rate) and random.random() < sample_rate and is_instrumented(request)
+    
+    async def aprocess_request(self, request):
+        # En ASGI, l'ORM s'exécute dans le thread de sync_to_async de la
+        # requête : c'est sur ses connexions qu'il faut poser le profileur
+        if self.is_sampled(request):
+            await sync_to_async(self.start_profile)(request)
+        return None
+    
+    async def aprocess_response(self, request, response):
+        if getattr(request, 'query_profile', None) is None:
+            return response
+        return await sync_to_async(self.process_response)(request, response)
+    
+    def process_request(self, request):
+        if self.is_sampled(request):
+            self.start_profile(request)
+        return None
+    
+    def start_profile(self, request):
+        profile = profiling.QueryProfile()
+        for connection in connections.all():
+            connection.execute_wrappers.append(profile)
+        request.query_profile = profile
+        request.query_profile_start = time.perf_counter()
+    
+    def process_response(self, request, response):
+        profile = getattr(request, 'query_profile', None)
+        if profile is None:
+            return response
+        
+        for connection in connections.all():
+            if profile in connection.execute_wrappers:
+                connection.execute_wrappers.remove(profile)
+        total_time = time.perf_counter() - request.query_profile_start
+        profiling.record(profile.report(request, response, total_time))
+        return response
+
+
+class LoggingMiddleware(AsyncMiddlewareMixin):
     """Middleware pour logger toutes les requêtes HTTP"""
     
+    async def aprocess_request(self, request):
+        await resolve_user(request)
+        return self.process_request(request)
+    
     def process_request(self, request):
+        if not is_instrumented(request):
+            return None
         request.start_time = timezone.now()
         user = request.user.username if request.user.is_authenticated else 'Anonyme'
         logger.info(f"➡️ {request.method} {request.path} | User: {user}")
@@ -22,29 +267,83 @@ class LoggingMiddleware(MiddlewareMixin):
         if hasattr(request, 'start_time'):
             duration = (timezone.now() - request.start_time).total_seconds()
             logger.info(f"⬅️ Status {response.status_code} | Durée: {duration:.3f}s")
+            
+            # Persister la requête (écriture groupée en arrière-plan)
+            if getattr(settings, 'REQUEST_LOG_ENABLED', True):
+                request_log_writer.submit(self.build_log(request, response, duration))
         return response
+    
+    def build_log(self, request, response, duration):
+        """Construit (sans l'enregistrer) le RequestLog de la requête"""
+        from exams.models import RequestLog
+        
+        user = getattr(request, 'user', None)
+        ip = get_client_ip(request)
+        
+        return RequestLog(
+            user_id=user.pk if user is not None and user.is_authenticated else None,
+            method=request.method[:10],
+            path=request.path[:500],
+            status_code=response.status_code,
+            ip_address=ip or '0.0.0.0',
+            user_agent=request.META.get('HTTP_USER_AGENT', ''),
+            timestamp=request.start_time,
+            response_time=duration,
+        )
 
 
-class SessionSecurityMiddleware(MiddlewareMixin):
-    """Middleware pour la sécurité des sessions"""
+class SessionSecurityMiddleware(AsyncMiddlewareMixin):
+    """
+    Middleware pour la sécurité des sessions.
+    
+    L'activité n'est réécrite dans la session (donc en base) que si l'IP a
+    changé ou si la dernière écriture date de plus de
+    SESSION_ACTIVITY_WRITE_INTERVAL secondes. Avec
+    SESSION_ACTIVITY_STORE = 'batched', chaque requête est aussi enregistrée
+    dans UserActivity par lots en arrière-plan.
+    """
+    
+    async def aprocess_request(self, request):
+        user = await resolve_user(request)
+        if user.is_authenticated:
+            # Charger la session sans bloquer : les accès suivants sont en mémoire
+            await request.session.aget('session_ip')
+            self.track(request)
+        return None
     
     def process_request(self, request):
         if request.user.is_authenticated:
-            # Mettre à jour l'heure de dernière activité
-            request.session['last_activity'] = timezone.now().isoformat()
-            
-            # Stocker l'IP de session
-            x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-            if x_forwarded_for:
-                ip = x_forwarded_for.split(',')[0]
-            else:
-                ip = request.META.get('REMOTE_ADDR')
-            request.session['session_ip'] = ip
-        
+            self.track(request)
         return None
+    
+    def track(self, request):
+        """Enregistre l'activité de l'utilisateur connecté"""
+        now = timezone.now()
+        
+        # IP de la requête
+        ip = get_client_ip(request)
+        
+        if getattr(settings, 'SESSION_ACTIVITY_STORE', None) == 'batched':
+            activity_writer.submit((request.user.pk, now, ip))
+        
+        # Mettre à jour la session seulement si nécessaire
+        if ip != request.session.get('session_ip') or self.is_stale(request.session.get('last_activity'), now):
+            request.session['last_activity'] = now.isoformat()
+            request.session['session_ip'] = ip
+    
+    def is_stale(self, last_activity, now):
+        """Vrai si la dernière activité enregistrée est absente ou trop ancienne"""
+        if not last_activity:
+            return True
+        try:
+            last = datetime.fromisoformat(last_activity)
+        except (TypeError, ValueError):
+            return True
+        interval = getattr(settings, 'SESSION_ACTIVITY_WRITE_INTERVAL', 60)
+        return now - last >= timedelta(seconds=interval)
 
 
-class ErrorHandlingMiddleware(MiddlewareMixin):
+class ErrorHandlingMiddleware(AsyncMiddlewareMixin):
     """Middleware pour gérer les erreurs"""
     
     def process_exception(self, request, exception):
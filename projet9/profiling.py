@@ -0,0 +1,117 @@
+"""
+Profilage des requêtes SQL par requête HTTP.
+
+Sur un échantillon de requêtes (QUERY_PROFILER_SAMPLE_RATE), compte les
+requêtes SQL et le temps passé en base, regroupe les requêtes de même forme
+(empreinte) pour repérer les N+1, puis émet un rapport par vue dans le log
+'projet9.profiling' et dans un tampon circulaire en mémoire.
+"""
+import functools
+import logging
+import re
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.http import HttpResponseForbidden, JsonResponse
+
+logger = logging.getLogger('projet9.profiling')
+
+_reports = deque(maxlen=getattr(settings, 'QUERY_PROFILER_BUFFER_SIZE', 200))
+_reports_lock = threading.Lock()
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_SPACES_RE = re.compile(r'\s+')
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(sql):
+    """Forme normalisée d'une requête : littéraux et listes IN (...) remplacés"""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return _SPACES_RE.sub(' ', sql).strip()
+
+
+class QueryProfile:
+    """execute_wrapper Django : mesure chaque requête SQL exécutée"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.by_fingerprint = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            stats = self.by_fingerprint.setdefault(fingerprint(sql), [0, 0.0])
+            stats[0] += 1
+            stats[1] += elapsed
+
+    def report(self, request, response, total_time):
+        threshold = getattr(settings, 'QUERY_PROFILER_N_PLUS_ONE_THRESHOLD', 5)
+        repeated = sorted(
+            (
+                {'sql': sql, 'count': count, 'time': round(elapsed, 6)}
+                for sql, (count, elapsed) in self.by_fingerprint.items()
+                if count > 1
+            ),
+            key=lambda item: item['count'],
+            reverse=True,
+        )
+        match = getattr(request, 'resolver_match', None)
+        return {
+            'view': match.view_name if match else '<unmatched>',
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_time': round(total_time, 6),
+            'queries': self.count,
+            'db_time': round(self.duration, 6),
+            'repeated': repeated,
+            'n_plus_one': [item for item in repeated if item['count'] >= threshold],
+        }
+
+
+def record(report):
+    """Ajoute un rapport au tampon circulaire et au log"""
+    with _reports_lock:
+        _reports.append(report)
+    if report['n_plus_one']:
+        worst = report['n_plus_one'][0]
+        logger.warning(
+            f"🐢 N+1 probable dans {report['view']} : {worst['count']}× « {worst['sql'][:200]} » "
+            f"({report['queries']} requêtes, {report['db_time'] * 1000:.1f} ms en base)"
+        )
+    else:
+        logger.info(
+            f"🔎 {report['view']} : {report['queries']} requêtes, {report['db_time'] * 1000:.1f} ms en base"
+        )
+
+
+def recent_reports(view=None):
+    """Derniers rapports (les plus récents en premier), filtrés par vue si précisé"""
+    with _reports_lock:
+        reports = list(_reports)
+    reports.reverse()
+    if view is not None:
+        reports = [report for report in reports if report['view'] == view]
+    return reports
+
+
+def query_reports_view(request):
+    """Rapports de profilage récents (JSON), réservé au staff"""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated or not user.is_staff:
+        return HttpResponseForbidden("403 Forbidden")
+    reports = recent_reports(request.GET.get('view'))
+    return JsonResponse({'reports': reports}, json_dumps_params={'ensure_ascii': False})
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -17,10 +18,22 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 # ===== CONFIGURATION DES MIDDLEWARES =====
 # True = Utilise Django | False = Utilise le code manuel
-USE_SESSION_MIDDLEWARE = False    # Session (connexion, etc.)
-USE_AUTH_MIDDLEWARE = True       # Authentification (request.user)
-USE_CSRF_MIDDLEWARE = True       # Protection CSRF
-USE_MESSAGES_MIDDLEWARE = True
+# Surchargeable par variable d'environnement (ex. USE_SESSION_MIDDLEWARE=1),
+# utilisé par la commande loadtest --compare
+def env_flag(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+USE_SESSION_MIDDLEWARE = env_flag('USE_SESSION_MIDDLEWARE', False)    # Session (connexion, etc.)
+USE_AUTH_MIDDLEWARE = env_flag('USE_AUTH_MIDDLEWARE', True)           # Authentification (request.user)
+USE_CSRF_MIDDLEWARE = env_flag('USE_CSRF_MIDDLEWARE', True)           # Protection CSRF
+USE_MESSAGES_MIDDLEWARE = env_flag('USE_MESSAGES_MIDDLEWARE', True)
+
+# Vues en lecture seule asynchrones (exams/async_views.py), activées par
+# projet9/asgi.py : en WSGI elles coûteraient une boucle d'événements par requête
+USE_ASYNC_VIEWS = env_flag('USE_ASYNC_VIEWS', False)
 
 'exams.replacements.ManualSessionMiddleware',
 # 'exams.replacements.ManualAuthMiddleware',
@@ -72,6 +85,8 @@ INSTALLED_APPS = [
 
 # ===== CONSTRUCTION DYNAMIQUE DES MIDDLEWARES =====
 MIDDLEWARE = [
+    'projet9.middleware.MetricsMiddleware',  # En premier : mesure toute la pile
+    'projet9.middleware.QueryProfilerMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
 ]
@@ -163,6 +178,27 @@ else:
     }
 
 
+# ===== CACHE PARTAGÉ (CACHES) =====
+# Versions des fragments de templates et des statistiques (exams/versions.py),
+# sessions (exams.session_store) : le cache doit être commun à tous les
+# workers gunicorn, d'où Redis en production (vérifié par check --deploy).
+# LocMemCache, propre à chaque processus, ne convient qu'à runserver.
+if DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+            'KEY_PREFIX': 'projet9',
+        }
+    }
+
+
 # Ajoute l'url ton url que ngrok t'a donné
 CORS_ALLOWED_ORIGINS = [
     "https://francene-misguided-evan.ngrok-free.dev",
@@ -175,6 +211,78 @@ CSRF_TRUSTED_ORIGINS = [
     "https://odimariano.pythonanywhere.com"
 ]
 
+# ===== STOCKAGE DES SESSIONS (ManualSessionMiddleware) =====
+# 'django.contrib.sessions.backends.db' = base seule
+# 'exams.session_store' = LRU local + cache Django + base (voir exams/session_store.py)
+MANUAL_SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+SESSION_WRITE_MODE = 'write_through'   # 'write_through' | 'write_behind'
+SESSION_LOCAL_CACHE_SIZE = 10000       # Sessions gardées en mémoire par processus
+SESSION_LOCAL_CACHE_TTL = 5 if DEBUG else 0  # Secondes, 0 = désactivé (non partagé entre workers)
+SESSION_WRITE_BEHIND_BATCH_SIZE = 200
+SESSION_WRITE_BEHIND_INTERVAL = 1.0
+
+# ===== CACHE DES UTILISATEURS (ManualAuthMiddleware) =====
+AUTH_USER_CACHE_SIZE = 10000           # Utilisateurs gardés en mémoire par processus
+AUTH_USER_CACHE_TTL = 30               # Secondes avant rechargement depuis la base
+
+# ===== ACTIVITÉ DES SESSIONS (SessionSecurityMiddleware) =====
+SESSION_ACTIVITY_WRITE_INTERVAL = 60   # Réécrire last_activity au plus toutes les N s
+SESSION_ACTIVITY_STORE = None          # None | 'batched' (table UserActivity, par lots)
+SESSION_ACTIVITY_BATCH_SIZE = 500
+SESSION_ACTIVITY_FLUSH_INTERVAL = 5.0
+
+# ===== COMPTEURS GLOBAUX (page d'accueil) =====
+GLOBAL_COUNTERS_CACHE_TTL = 30         # Secondes de cache des compteurs
+
+# ===== CACHE DU CONTENU DES EXAMENS =====
+# Niveau 1 : LRU en mémoire du processus | Niveau 2 : cache Django (CACHES)
+EXAM_CONTENT_LRU_SIZE = 256           # Nombre d'examens gardés en mémoire
+EXAM_CONTENT_CACHE_TIMEOUT = 60 * 60  # Durée de vie dans le cache Django (s)
+
+# ===== CACHE DES FRAGMENTS DE TEMPLATES ({% cache %}) =====
+# Clés versionnées (exams/versions.py, Exam.updated_at) : une modification
+# change la clé, le délai ne sert qu'à libérer les entrées orphelines
+FRAGMENT_CACHE_TIMEOUT = 24 * 60 * 60
+
+# ===== CORRECTION DES EXAMENS =====
+# 'inline' : la session est notée pendant la requête de soumission
+# 'deferred' : la soumission met la session en file, un thread d'arrière-plan
+#              la note par lots (exams/grading.py, commande grade_pending)
+GRADING_MODE = os.environ.get('GRADING_MODE', 'inline')
+GRADING_QUEUE_SIZE = 10000          # Sessions en attente max par processus
+GRADING_BATCH_SIZE = 200            # Sessions notées par lot
+GRADING_FLUSH_INTERVAL = 0.5        # Correction au plus tard après N secondes
+GRADING_RETRY_AFTER = 30            # Remise en file d'une session oubliée (s)
+
+# ===== JOURNALISATION DES REQUÊTES (RequestLog) =====
+# Les logs passent par une file bornée vidée par lots (bulk_create)
+REQUEST_LOG_ENABLED = True
+REQUEST_LOG_QUEUE_SIZE = 10000      # Taille max de la file en mémoire
+REQUEST_LOG_BATCH_SIZE = 500        # Lignes insérées par requête SQL
+REQUEST_LOG_FLUSH_INTERVAL = 2.0    # Écriture au plus tard après N secondes
+REQUEST_LOG_SAMPLE_RATE = 1.0       # 1.0 = toutes les requêtes, 0.1 = 10 %
+REQUEST_LOG_OVERFLOW = 'drop_new'   # File pleine : 'drop_new' | 'drop_oldest'
+# Proxys inverses de confiance devant l'application (X-Forwarded-For n'est lu
+# qu'au-delà de 0) : un en production (PythonAnywhere), aucun avec runserver
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 0 if DEBUG else 1))
+
+# ===== MÉTRIQUES (/metrics) =====
+# Accessible depuis ces IP (scraper Prometheus) ou par un membre du staff
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# ===== ROUTES NON INSTRUMENTÉES =====
+# Ni journalisées, ni profilées, ni mesurées : routes très fréquentes et
+# légères (une sauvegarde automatique par réponse cochée)
+INSTRUMENTATION_EXCLUDED_URL_NAMES = ['autosave_answer']
+
+# ===== PROFILAGE SQL PAR REQUÊTE =====
+QUERY_PROFILER_SAMPLE_RATE = 0.0            # 0.01 = 1 % des requêtes profilées
+QUERY_PROFILER_N_PLUS_ONE_THRESHOLD = 5     # Répétitions d'une même requête = N+1
+QUERY_PROFILER_BUFFER_SIZE = 200            # Rapports gardés en mémoire
+
+# ===== STATISTIQUES DES EXAMENS (staff) =====
+EXAM_ANALYTICS_CACHE_TIMEOUT = 24 * 60 * 60  # Invalidé dès qu'une session se termine
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -16,8 +16,12 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from projet9.metrics import metrics_view
+from projet9.profiling import query_reports_view
 
 urlpatterns = [
     # path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
+    path('metrics/queries/', query_reports_view, name='query_reports'),
     path('', include('exams.urls')),
 ]
\ No newline at end of file